@@ -0,0 +1 @@
+"""Headless benchmarks for the dashboard projects"""
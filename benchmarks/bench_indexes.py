@@ -0,0 +1,132 @@
+"""Query plans and latency of the tracker queries before and after migrations.
+
+Each tracker's tables are created with ``create_all`` only (no migrations)
+in a scratch database, seeded, and a representative set of the queries the
+app issues is timed and explained. The tracker's ``MIGRATIONS`` are then
+applied and the same queries measured again.
+
+Usage:
+    python -m benchmarks.bench_indexes --size 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks import seed
+from benchmarks.run_benchmarks import load_module, working_directory
+from common.migrations import apply_migrations
+from common.storage import get_engine
+
+def _queries():
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    quarter_ago = (today - timedelta(days=90)).isoformat()
+    today = today.isoformat()
+    return {
+        "expense_tracker": [
+            ("expenses in range",
+             "SELECT * FROM expenses WHERE date BETWEEN ? AND ?", (month_ago, today)),
+            ("category totals",
+             "SELECT category, SUM(amount) FROM expenses WHERE date BETWEEN ? AND ? GROUP BY category",
+             (month_ago, today)),
+            ("daily totals",
+             "SELECT date, SUM(amount) FROM expenses WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date",
+             (month_ago, today)),
+        ],
+        "finance_tracker": [
+            ("transactions in range",
+             "SELECT * FROM transactions WHERE date BETWEEN ? AND ? ORDER BY date", (quarter_ago, today)),
+            ("category totals",
+             "SELECT category, SUM(amount) FROM transactions WHERE date BETWEEN ? AND ? GROUP BY category",
+             (quarter_ago, today)),
+        ],
+        "task_manager": [
+            ("open tasks by due date",
+             "SELECT * FROM tasks WHERE completed = 0 ORDER BY due_date LIMIT 50", ()),
+            ("overdue count",
+             "SELECT COUNT(*) FROM tasks WHERE completed = 0 AND due_date < ?", (today,)),
+        ],
+        "health_fitness_tracker": [
+            ("last 90 days",
+             "SELECT * FROM health_entries WHERE date >= ? ORDER BY date", (quarter_ago,)),
+        ],
+    }
+
+def measure(engine, queries, repeats):
+    results = []
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for name, sql, params in queries:
+            plan = [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                rows = cursor.execute(sql, params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results.append({
+                "query": name,
+                "plan": plan,
+                "rows": len(rows),
+                "best_ms": min(timings),
+                "median_ms": sorted(timings)[len(timings) // 2]
+            })
+    finally:
+        connection.close()
+    return results
+
+def bench_project(project_name, size, repeats):
+    with tempfile.TemporaryDirectory() as workdir, working_directory(workdir):
+        module = load_module(project_name)
+        try:
+            engine = get_engine(os.path.join(workdir, "bench_indexes.db"))
+            module.Base.metadata.create_all(engine)
+            seed.seed(project_name, engine, size)
+            queries = _queries()[project_name]
+            before = measure(engine, queries, repeats)
+            started = time.perf_counter()
+            apply_migrations(engine, module.MIGRATIONS)
+            migration_s = time.perf_counter() - started
+            after = measure(engine, queries, repeats)
+            engine.dispose()
+        finally:
+            module.engine.dispose()
+            sys.modules.pop(module.__name__, None)
+    return {
+        "project": project_name,
+        "size": size,
+        "migration_s": migration_s,
+        "before": before,
+        "after": after
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare tracker query plans before and after migrations")
+    parser.add_argument("-p", "--project", action="append", choices=sorted(seed.TABLES))
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", default="bench_indexes.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    for project_name in args.project or sorted(seed.TABLES):
+        print(f"Benchmarking {project_name} ({args.size} rows)...", file=sys.stderr)
+        result = bench_project(project_name, args.size, args.repeats)
+        results.append(result)
+        print(f"{project_name}: migrations took {result['migration_s']:.2f}s")
+        for before, after in zip(result["before"], result["after"]):
+            print(f"  {before['query']:<26} {before['median_ms']:9.2f}ms -> {after['median_ms']:9.2f}ms")
+            print(f"    before: {'; '.join(before['plan'])}")
+            print(f"    after:  {'; '.join(after['plan'])}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {os.path.abspath(args.output)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Local stand-ins for the network backends the projects talk to.
+
+While ``stand_ins()`` is active no request leaves the machine: ``requests``
+calls are answered from canned TheMealDB, NASA and CoinGecko payloads,
+``pandas.read_csv`` on a URL returns a synthetic USGS or Fandango frame,
+and ``yfinance`` is replaced by a module that generates OHLCV history.
+Every call is counted so benchmarks can report HTTP calls per rerun.
+"""
+import contextlib
+import json
+import random
+import sys
+import types
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+
+class CallCounter:
+    """Counts HTTP-equivalent calls and database statements"""
+
+    def __init__(self):
+        self.http_calls = 0
+        self.db_queries = 0
+
+    def reset(self):
+        self.http_calls = 0
+        self.db_queries = 0
+
+def _meals(category, count=20):
+    return [{
+        "idMeal": str(52700 + i),
+        "strMeal": f"{category} Dish {i}",
+        "strMealThumb": f"https://www.themealdb.com/images/media/meals/{i}.jpg"
+    } for i in range(count)]
+
+def _meal_details(meal_id):
+    details = {
+        "idMeal": meal_id,
+        "strMeal": f"Dish {meal_id}",
+        "strCategory": "Vegetarian",
+        "strArea": "Local",
+        "strInstructions": "Mix everything and cook until done.",
+        "strSource": "https://example.com/recipe"
+    }
+    for i in range(1, 21):
+        details[f"strIngredient{i}"] = f"Ingredient {i}" if i <= 8 else ""
+        details[f"strMeasure{i}"] = "1 cup" if i <= 8 else ""
+    return details
+
+def _apod(count=5):
+    return [{
+        "title": f"Picture {i}",
+        "url": f"https://apod.nasa.gov/apod/image/{i}.jpg",
+        "explanation": "A synthetic astronomy picture."
+    } for i in range(count)]
+
+def _coin_markets(count=10):
+    rng = random.Random(7)
+    return [{
+        "id": f"coin-{i}",
+        "name": f"Coin {i}",
+        "image": f"https://assets.coingecko.com/coins/images/{i}/large.png",
+        "current_price": rng.uniform(1, 50000),
+        "market_cap": rng.uniform(1e8, 1e12),
+        "market_cap_rank": i + 1,
+        "price_change_percentage_24h": rng.uniform(-10, 10),
+        "total_volume": rng.uniform(1e6, 1e10),
+        "circulating_supply": rng.uniform(1e6, 1e10),
+        "total_supply": rng.uniform(1e6, 1e10)
+    } for i in range(count)]
+
+def _coin_chart(days=30, points_per_day=24):
+    end = datetime.now()
+    count = days * points_per_day
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.01, count)))
+    return {"prices": [
+        [int((end - timedelta(hours=count - i)).timestamp() * 1000), float(p)]
+        for i, p in enumerate(prices)
+    ]}
+
+def route(url):
+    """Return (status, JSON payload) for a URL the projects are known to call"""
+    if "themealdb.com" in url:
+        if "filter.php" in url:
+            return 200, {"meals": _meals(url.rsplit("=", 1)[-1])}
+        if "lookup.php" in url:
+            return 200, {"meals": [_meal_details(url.rsplit("=", 1)[-1])]}
+    if "api.nasa.gov" in url:
+        return 200, _apod()
+    if "coingecko.com" in url:
+        if "/coins/markets" in url:
+            return 200, _coin_markets()
+        if "/market_chart" in url:
+            return 200, _coin_chart()
+        if "/ping" in url:
+            return 200, {"gecko_says": "(V3) To the Moon!"}
+    return 404, {}
+
+def synthetic_csv(url, rows=5000):
+    """Frames standing in for the USGS feed and the Fandango ratings CSV"""
+    rng = np.random.default_rng(11)
+    if "earthquake.usgs.gov" in url:
+        return pd.DataFrame({
+            "time": pd.date_range(end=datetime.now(), periods=rows, freq="9min").astype(str),
+            "latitude": rng.uniform(-90, 90, rows),
+            "longitude": rng.uniform(-180, 180, rows),
+            "mag": rng.uniform(0, 8, rows).round(1),
+            "depth": rng.uniform(0, 700, rows),
+            "place": [f"Region {i % 250}" for i in range(rows)]
+        })
+    if "fandango" in url:
+        count = 150
+        return pd.DataFrame({
+            "FILM": [f"Film {i}" for i in range(count)],
+            "RottenTomatoes": rng.integers(0, 100, count),
+            "Metacritic": rng.integers(0, 100, count),
+            "IMDB": rng.uniform(1, 10, count).round(1),
+            "Fandango": rng.uniform(1, 5, count).round(1)
+        })
+    raise FileNotFoundError(url)
+
+def price_history(ticker, days=21, end=None):
+    """Deterministic daily OHLCV history for a ticker"""
+    # crc32 rather than hash(), which is salted per process
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    index = pd.bdate_range(end=end or datetime.now().date(), periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    spread = np.abs(rng.normal(0, 0.01, days)) * close
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.005, days) * close,
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 10_000_000, days)
+    }, index=index)
+
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252,
+               "2y": 504, "5y": 1260, "10y": 2520, "max": 5040}
+
+def fake_yfinance(counter):
+    """A module exposing the small part of the yfinance API the projects use"""
+    module = types.ModuleType("yfinance")
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, period="1mo", interval="1d", **kwargs):
+            counter.http_calls += 1
+            return price_history(self.ticker, PERIOD_DAYS.get(period, 21))
+
+    def download(tickers, period="1mo", interval="1d", group_by="column", **kwargs):
+        counter.http_calls += 1
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        frames = {t: price_history(t, PERIOD_DAYS.get(period, 21)) for t in tickers}
+        data = pd.concat(frames, axis=1)
+        if group_by != "ticker":
+            data = data.swaplevel(axis=1).sort_index(axis=1)
+        return data
+
+    module.Ticker = Ticker
+    module.download = download
+    return module
+
+@contextlib.contextmanager
+def stand_ins(counter=None):
+    """Route all project network traffic to local stand-ins for the duration"""
+    counter = counter or CallCounter()
+    original_request = requests.sessions.Session.request
+    original_read_csv = pd.read_csv
+    original_yfinance = sys.modules.get("yfinance")
+
+    def request(self, method, url, *args, **kwargs):
+        counter.http_calls += 1
+        status, payload = route(url)
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response._content = json.dumps(payload).encode()
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+    def read_csv(source, *args, **kwargs):
+        if isinstance(source, str) and source.startswith(("http://", "https://")):
+            counter.http_calls += 1
+            return synthetic_csv(source)
+        return original_read_csv(source, *args, **kwargs)
+
+    requests.sessions.Session.request = request
+    pd.read_csv = read_csv
+    sys.modules["yfinance"] = fake_yfinance(counter)
+    try:
+        yield counter
+    finally:
+        requests.sessions.Session.request = original_request
+        pd.read_csv = original_read_csv
+        if original_yfinance is None:
+            sys.modules.pop("yfinance", None)
+        else:
+            sys.modules["yfinance"] = original_yfinance
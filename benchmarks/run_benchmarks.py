@@ -0,0 +1,207 @@
+"""Drive every project headlessly through Streamlit's AppTest and time it.
+
+For each project (and, for the SQLite trackers, each data size) the app is
+loaded in a scratch directory, seeded, run once to warm up and then rerun
+``--reruns`` times. Latency percentiles come from the plain reruns; peak
+memory comes from one extra rerun under tracemalloc so tracing overhead
+doesn't distort the timings.
+
+Usage:
+    python -m benchmarks.run_benchmarks -o bench_results.json
+    python -m benchmarks.run_benchmarks -p expense_tracker --sizes 10000 100000 1000000
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from streamlit.testing.v1 import AppTest
+
+from benchmarks import fakes, seed
+from common.projects import load_project_module
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = [10_000]
+
+# Runs the already-imported project module inside AppTest
+RUNNER_SCRIPT = """
+import sys
+sys.modules[{module_name!r}].main()
+"""
+
+def discover_projects():
+    """Every project directory with an app.py"""
+    return sorted(p.parent.name for p in ROOT.glob("*/app.py"))
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+@contextlib.contextmanager
+def count_queries(counter):
+    """Count every SQL statement executed by any engine"""
+    def before_cursor_execute(*args, **kwargs):
+        counter.db_queries += 1
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+def load_module(project_name):
+    """Import a project's app.py the same way the dashboard registry does"""
+    return load_project_module(project_name)
+
+def has_main(project_name):
+    source = (ROOT / project_name / "app.py").read_text(encoding="utf-8")
+    return "\ndef main(" in source
+
+def run_scenario(project_name, size, reruns, timeout):
+    """Benchmark one project at one data size; returns a result dict"""
+    result = {"project": project_name, "size": size, "reruns": reruns, "error": None}
+    counter = fakes.CallCounter()
+    module = None
+    with tempfile.TemporaryDirectory() as workdir, working_directory(workdir), \
+            fakes.stand_ins(counter), count_queries(counter):
+        try:
+            if has_main(project_name):
+                module = load_module(project_name)
+                if size and project_name in seed.TABLES:
+                    started = time.perf_counter()
+                    seed.seed(project_name, module.engine, size)
+                    with module.engine.begin() as connection:
+                        for rebuild in getattr(module, "DERIVED_TABLE_BUILDERS", []):
+                            rebuild(connection)
+                    result["seed_time_s"] = time.perf_counter() - started
+                app = AppTest.from_string(
+                    RUNNER_SCRIPT.format(module_name=module.__name__),
+                    default_timeout=timeout
+                )
+            else:
+                # Script-style projects render at import time
+                app = AppTest.from_file(str(ROOT / project_name / "app.py"), default_timeout=timeout)
+
+            counter.reset()
+            started = time.perf_counter()
+            app.run()
+            result["first_run_ms"] = (time.perf_counter() - started) * 1000
+            if app.exception:
+                result["error"] = app.exception[0].message
+                return result
+
+            latencies, queries, http_calls = [], [], []
+            for _ in range(reruns):
+                counter.reset()
+                started = time.perf_counter()
+                app.run()
+                latencies.append((time.perf_counter() - started) * 1000)
+                queries.append(counter.db_queries)
+                http_calls.append(counter.http_calls)
+
+            tracemalloc.start()
+            try:
+                app.run()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            result.update({
+                "latency_ms": {
+                    "p50": percentile(latencies, 50),
+                    "p90": percentile(latencies, 90),
+                    "p99": percentile(latencies, 99),
+                    "mean": sum(latencies) / len(latencies),
+                    "max": max(latencies)
+                },
+                "peak_memory_mb": peak / 2 ** 20,
+                "db_queries_per_rerun": sum(queries) / len(queries),
+                "http_calls_per_rerun": sum(http_calls) / len(http_calls)
+            })
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            if module is not None:
+                engine = getattr(module, "engine", None)
+                if engine is not None:
+                    engine.dispose()
+                sys.modules.pop(module.__name__, None)
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(projects, sizes, reruns, timeout, progress=None):
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": []
+    }
+    for project_name in projects:
+        project_sizes = sizes if project_name in seed.TABLES else [0]
+        for size in project_sizes:
+            if progress:
+                progress(project_name, size)
+            report["results"].append(run_scenario(project_name, size, reruns, timeout))
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark project reruns headlessly")
+    parser.add_argument("-p", "--project", action="append",
+                        help="only benchmark this project (repeatable)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="row counts to seed into the SQLite trackers")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120,
+                        help="seconds allowed for a single rerun")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.project or discover_projects(), args.sizes, args.reruns, args.timeout,
+        progress=lambda name, size: print(f"Benchmarking {name} ({size} rows)...", file=sys.stderr)
+    )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for row in report["results"]:
+        if row["error"]:
+            print(f"{row['project']:<28} {row['size']:>9}  ERROR {row['error']}")
+            continue
+        latency = row["latency_ms"]
+        print(f"{row['project']:<28} {row['size']:>9}  p50 {latency['p50']:8.1f}ms  "
+              f"p99 {latency['p99']:8.1f}ms  {row['peak_memory_mb']:7.1f}MB  "
+              f"{row['db_queries_per_rerun']:5.1f} sql  {row['http_calls_per_rerun']:5.1f} http")
+    print(f"Results written to {os.path.abspath(args.output)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Synthetic data for the SQLite-backed trackers.
+
+Rows are written straight through the DBAPI connection of the project's
+module-level ``engine`` with ``executemany``, so seeding a million rows
+takes seconds and does not depend on the tracker's own write path.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+EXPENSE_CATEGORIES = [
+    "Food", "Transport", "Housing", "Utilities",
+    "Entertainment", "Shopping", "Healthcare", "Other"
+]
+TRANSACTION_CATEGORIES = ["Income", "Food", "Transport", "Entertainment", "Bills", "Shopping", "Other"]
+PRIORITIES = ["Low", "Medium", "High"]
+WORKOUT_TYPES = ["Cardio", "Strength Training", "Yoga", "Running", "Other"]
+
+# Seeded rows are spread over this many days ending today
+HISTORY_DAYS = 3 * 365
+BATCH_SIZE = 50_000
+
+def _dates(days=HISTORY_DAYS, forward=False):
+    today = date.today()
+    step = 1 if forward else -1
+    return [(today + timedelta(days=step * i)).isoformat() for i in range(days)]
+
+def _expense_rows(rng, size):
+    dates = _dates()
+    for i in range(size):
+        yield (rng.choice(dates), rng.choice(EXPENSE_CATEGORIES),
+               round(rng.uniform(1, 200), 2), f"Expense {i}")
+
+def _transaction_rows(rng, size):
+    dates = _dates()
+    for i in range(size):
+        category = rng.choice(TRANSACTION_CATEGORIES)
+        amount = rng.uniform(500, 5000) if category == "Income" else rng.uniform(1, 300)
+        yield (rng.choice(dates), category, round(amount, 2), f"Transaction {i}")
+
+def _task_rows(rng, size):
+    dates = _dates(180) + _dates(180, forward=True)
+    now = datetime.now()
+    for i in range(size):
+        created_at = now - timedelta(days=rng.uniform(0, 360))
+        completed = rng.random() < 0.6
+        completed_at = min(now, created_at + timedelta(days=rng.expovariate(1 / 7))) if completed else None
+        yield (f"Task {i}", f"Description for task {i}", rng.choice(PRIORITIES),
+               rng.choice(dates), int(completed), str(created_at), completed_at and str(completed_at))
+
+def _health_rows(rng, size):
+    dates = _dates()
+    for i in range(size):
+        yield (dates[i % len(dates)], round(rng.uniform(60, 90), 1), rng.randint(1500, 3500),
+               rng.randint(1000, 20000), rng.choice(WORKOUT_TYPES), rng.randint(0, 120))
+
+TABLES = {
+    "expense_tracker": (
+        "INSERT INTO expenses (date, category, amount, description) VALUES (?, ?, ?, ?)",
+        _expense_rows
+    ),
+    "finance_tracker": (
+        "INSERT INTO transactions (date, category, amount, description) VALUES (?, ?, ?, ?)",
+        _transaction_rows
+    ),
+    "task_manager": (
+        "INSERT INTO tasks (title, description, priority, due_date, completed, created_at, completed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        _task_rows
+    ),
+    "health_fitness_tracker": (
+        "INSERT INTO health_entries (date, weight, calories, steps, workout_type, workout_duration) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        _health_rows
+    ),
+}
+
+def seed(project_name, engine, size, seed=42):
+    """Insert ``size`` synthetic rows into the project's main table"""
+    statement, rows = TABLES[project_name]
+    rng = random.Random(seed)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        batch = []
+        for row in rows(rng, size):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(statement, batch)
+                batch = []
+        if batch:
+            cursor.executemany(statement, batch)
+        connection.commit()
+    finally:
+        connection.close()
@@ -0,0 +1,209 @@
+"""Vectorized strategy backtests for the stock simulator.
+
+A universe is a set of tickers aligned on one bar index, held as 2D arrays
+(bars x tickers). A strategy is a function ``signal(universe, **params)``
+returning the target exposure per bar and ticker in [-1, 1]. The whole
+history is simulated with array operations: exposures are decided on each
+bar's close and held over the next bar, sized equally or by inverse
+volatility, and every change in weight pays fees and slippage on the
+traded notional.
+
+``sweep`` runs one strategy over a grid of parameters, fanning chunks of
+the grid out to a process pool that receives the universe once per worker.
+"""
+import itertools
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+PERIODS_PER_YEAR = 252
+SIZINGS = ("equal", "inverse_vol")
+VOLATILITY_WINDOW = 20
+
+# ``index`` is a DatetimeIndex; the price columns are float arrays of shape (bars, tickers)
+Universe = namedtuple("Universe", ["index", "tickers", "open", "high", "low", "close", "volume"])
+
+BacktestResult = namedtuple("BacktestResult", ["equity", "returns", "drawdown", "weights", "stats"])
+
+def align_universe(histories):
+    """Align OHLCV frames per ticker on the union of their bars
+
+    Prices are carried forward over gaps; bars before a ticker's first
+    trade stay NaN and are never held.
+    """
+    tickers = [ticker for ticker, data in histories.items() if data is not None and not data.empty]
+    if not tickers:
+        raise ValueError("No price history for any ticker in the universe")
+    index = histories[tickers[0]].index
+    for ticker in tickers[1:]:
+        index = index.union(histories[ticker].index)
+
+    def column(name):
+        frame = pd.concat({ticker: histories[ticker][name] for ticker in tickers}, axis=1)
+        return frame.reindex(index).ffill().to_numpy(dtype=np.float64)
+
+    return Universe(index, tickers, *(column(name) for name in ("Open", "High", "Low", "Close", "Volume")))
+
+def _check_bars(name, bars):
+    if bars != int(bars) or bars < 1:
+        raise ValueError(f"{name} must be a whole number of bars of at least 1, not {bars}")
+
+def rolling_mean(values, window):
+    """Trailing mean over ``window`` bars along axis 0; NaN until ``window`` valid bars are in"""
+    _check_bars("window", window)
+    window = int(window)
+    out = np.full(values.shape, np.nan)
+    if window > len(values):
+        return out
+    valid = ~np.isnan(values)
+    total = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total[window:] = total[window:] - total[:-window]
+    count[window:] = count[window:] - count[:-window]
+    full = count[window - 1:] == window
+    out[window - 1:][full] = total[window - 1:][full] / window
+    return out
+
+def rolling_std(values, window):
+    mean = rolling_mean(values, window)
+    return np.sqrt(np.maximum(rolling_mean(values * values, window) - mean * mean, 0.0))
+
+def simple_returns(close):
+    returns = np.zeros_like(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = close[1:] / close[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+# Strategies
+
+def sma_crossover(universe, fast=20, slow=50):
+    """Long while the fast moving average is above the slow one"""
+    _check_bars("fast", fast)
+    _check_bars("slow", slow)
+    if fast >= slow:
+        return np.zeros_like(universe.close)
+    close = universe.close
+    return (rolling_mean(close, fast) > rolling_mean(close, slow)).astype(np.float64)
+
+def momentum(universe, lookback=60, allow_short=False):
+    """Long after a positive ``lookback``-bar return, short (or flat) after a negative one"""
+    _check_bars("lookback", lookback)
+    lookback = int(lookback)
+    close = universe.close
+    change = np.full(close.shape, np.nan)
+    change[lookback:] = close[lookback:] / close[:-lookback] - 1
+    signal = np.sign(np.nan_to_num(change))
+    return signal if allow_short else np.maximum(signal, 0.0)
+
+def mean_reversion(universe, window=20, threshold=1.0):
+    """Long below ``threshold`` standard deviations under the mean, short above it"""
+    close = universe.close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zscore = (close - rolling_mean(close, window)) / rolling_std(close, window)
+    return -np.sign(zscore) * (np.abs(zscore) > threshold)
+
+STRATEGIES = {
+    "SMA crossover": sma_crossover,
+    "Momentum": momentum,
+    "Mean reversion": mean_reversion,
+}
+
+def position_weights(exposure, close, sizing="equal", leverage=1.0):
+    """Portfolio weights from exposures, with gross exposure at most ``leverage``"""
+    if sizing not in SIZINGS:
+        raise ValueError(f"Unknown sizing {sizing!r}; choose from {', '.join(SIZINGS)}")
+    tradable = ~np.isnan(close)
+    exposure = np.where(tradable, np.clip(np.nan_to_num(exposure), -1.0, 1.0), 0.0)
+    if sizing == "equal":
+        scale = np.broadcast_to(1.0 / max(close.shape[1], 1), exposure.shape)
+    else:
+        volatility = rolling_std(simple_returns(close), VOLATILITY_WINDOW)
+        with np.errstate(divide="ignore"):
+            inverse = np.where(volatility > 0, 1.0 / volatility, 0.0)
+        inverse = np.where(tradable, inverse, 0.0)
+        total = inverse.sum(axis=1, keepdims=True)
+        scale = np.divide(inverse, total, out=np.zeros_like(inverse), where=total > 0)
+    return exposure * scale * leverage
+
+def run(universe, strategy, params=None, initial_capital=10000.0, fee_bps=1.0, slippage_bps=5.0,
+        sizing="equal", leverage=1.0, periods_per_year=PERIODS_PER_YEAR):
+    """Backtest ``strategy`` over the universe; returns the equity curve and summary statistics"""
+    weights = position_weights(strategy(universe, **(params or {})), universe.close, sizing, leverage)
+    returns = simple_returns(universe.close)
+
+    # Weights chosen on bar t's close earn bar t + 1's return
+    held = np.zeros_like(weights)
+    held[1:] = weights[:-1]
+    gross = (held * returns).sum(axis=1)
+    traded = np.abs(np.diff(weights, axis=0, prepend=0.0)).sum(axis=1)
+    costs = traded * (fee_bps + slippage_bps) / 10_000
+    net = gross - costs
+
+    equity = initial_capital * np.cumprod(1 + net)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    return BacktestResult(
+        pd.Series(equity, index=universe.index),
+        pd.Series(net, index=universe.index),
+        pd.Series(drawdown, index=universe.index),
+        pd.DataFrame(weights, index=universe.index, columns=universe.tickers),
+        statistics(net, equity, drawdown, traded, initial_capital, periods_per_year)
+    )
+
+def statistics(returns, equity, drawdown, traded, initial_capital, periods_per_year=PERIODS_PER_YEAR):
+    bars = len(returns)
+    years = bars / periods_per_year
+    volatility = returns.std()
+    final = equity[-1] if bars else initial_capital
+    return {
+        "total_return": final / initial_capital - 1,
+        "cagr": (final / initial_capital) ** (1 / years) - 1 if years > 0 and final > 0 else np.nan,
+        "volatility": volatility * np.sqrt(periods_per_year),
+        "sharpe": returns.mean() / volatility * np.sqrt(periods_per_year) if volatility > 0 else np.nan,
+        "max_drawdown": drawdown.min() if bars else 0.0,
+        "turnover": traded.sum() / years if years > 0 else np.nan,
+    }
+
+# Parameter sweeps
+
+_worker_universe = None
+
+def _init_worker(universe):
+    global _worker_universe
+    _worker_universe = universe
+
+def _run_chunk(strategy, chunk, options, universe=None):
+    universe = _worker_universe if universe is None else universe
+    rows = []
+    for params in chunk:
+        stats = run(universe, strategy, params, **options).stats
+        rows.append({**params, **stats})
+    return rows
+
+def parameter_grid(grid):
+    """Every combination of ``{name: [values]}`` as a list of dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def sweep(universe, strategy, grid, processes=None, chunk_size=64, **options):
+    """Statistics for every parameter combination, best Sharpe first
+
+    ``strategy`` must be a module-level function so worker processes can
+    import it. Small grids, or ``processes=1``, run in this process.
+    """
+    combinations = parameter_grid(grid)
+    chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+    if processes == 1 or len(chunks) <= 1:
+        rows = [row for chunk in chunks for row in _run_chunk(strategy, chunk, options, universe)]
+    else:
+        # Spawned workers are safe to start from the threaded Streamlit server
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(universe,)) as pool:
+            futures = [pool.submit(_run_chunk, strategy, chunk, options) for chunk in chunks]
+            rows = [row for future in futures for row in future.result()]
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    return results.sort_values("sharpe", ascending=False, na_position="last").reset_index(drop=True)
@@ -0,0 +1,252 @@
+"""Streaming bulk import of CSV/Parquet exports into the tracker tables.
+
+Files are read in chunks, each chunk is normalised with vectorised pandas
+operations (column aliases, dates, amounts, categories) and written with a
+single ``executemany`` inside its own transaction, so memory use stays flat
+and a million-row bank export imports in seconds.
+
+The meaning of an amount's sign is set by one of ``SIGN_CONVENTIONS``.
+With a signed convention, money coming in goes to the target's
+``income_category`` when the export gives no usable category. A row whose
+direction contradicts its category, such as a refund, is stored as a
+negative amount so it nets against that category. Targets without an
+income category reject money coming in and count those rows as rejected.
+
+Usage:
+    python -m common.bulk_import expense_tracker bank_export.csv
+    python -m common.bulk_import finance_tracker history.parquet --chunksize 200000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from common import query_cache, snapshots
+from common.lazy_imports import lazy_import
+from common.projects import load_project_module
+
+# Heavy dependencies are only imported when first used
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Accepted spellings for each column, compared case-insensitively
+COLUMN_ALIASES = {
+    "date": ["date", "transaction date", "posted date", "posting date", "booking date"],
+    "category": ["category", "type"],
+    "amount": ["amount", "value", "sum"],
+    "description": ["description", "memo", "details", "narrative", "payee"],
+}
+
+# What the sign of an exported amount means
+SIGN_CONVENTIONS = {
+    "unsigned": "Amounts are magnitudes; the category decides",
+    "debits-positive": "Positive amounts are money out, negative money in",
+    "credits-positive": "Positive amounts are money in, negative money out",
+}
+
+# ``after_insert(connection, rows)`` runs in the same transaction as each chunk;
+# ``signs`` is the target's default key of SIGN_CONVENTIONS
+ImportTarget = namedtuple(
+    "ImportTarget",
+    ["table", "categories", "default_category", "after_insert", "income_category", "signs"],
+    defaults=[None, None, "unsigned"]
+)
+
+class ImportProgress:
+    """Running totals reported after every chunk"""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.fraction = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed_s(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_s(self):
+        return self.rows_imported / self.elapsed_s if self.elapsed_s else 0.0
+
+def detect_format(name):
+    suffix = Path(name).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"Unsupported file type: {suffix or name}")
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return getattr(source, "size", None)
+
+def iter_chunks(source, fmt, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield (DataFrame, fraction read) pairs without loading the whole file"""
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet import requires pyarrow: pip install pyarrow")
+        parquet_file = pq.ParquetFile(source)
+        total = parquet_file.metadata.num_rows or 1
+        read = 0
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            read += batch.num_rows
+            yield batch.to_pandas(), read / total
+        return
+
+    size = _source_size(source)
+    handle = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        for chunk in pd.read_csv(handle, chunksize=chunksize, dtype=str, skipinitialspace=True):
+            fraction = min(handle.tell() / size, 1.0) if size else 0.0
+            yield chunk, fraction
+    finally:
+        if handle is not source:
+            handle.close()
+
+def _rename_columns(chunk):
+    lookup = {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = {}
+    for original in chunk.columns:
+        column = lookup.get(str(original).strip().lower())
+        if column and column not in renamed.values():
+            renamed[original] = column
+    chunk = chunk.rename(columns=renamed)
+    missing = {"date", "amount"} - set(chunk.columns)
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(sorted(missing))}")
+    return chunk
+
+def normalize_chunk(chunk, target, date_format=None, dayfirst=False, signs=None):
+    """Clean one chunk; returns (rows ready to insert, number of rejected rows)"""
+    signs = signs or target.signs
+    if signs not in SIGN_CONVENTIONS:
+        raise ValueError(f"Unknown sign convention {signs!r}; choose from {', '.join(SIGN_CONVENTIONS)}")
+    chunk = _rename_columns(chunk)
+    dates = pd.to_datetime(chunk["date"], format=date_format, dayfirst=dayfirst, errors="coerce")
+    signed = pd.to_numeric(chunk["amount"], errors="coerce")
+    amounts = signed.abs()
+
+    if "category" in chunk.columns:
+        # Exports repeat a handful of categories, so clean the distinct values only
+        codes, uniques = pd.factorize(chunk["category"])
+        known = {c.lower(): c for c in target.categories}
+        cleaned = [known.get(str(value).strip().lower()) for value in uniques] + [None]
+        recognised = np.array([value is not None for value in cleaned])[codes]
+        cleaned = np.array([value or target.default_category for value in cleaned], dtype=object)
+        categories = pd.Series(cleaned[codes], index=chunk.index)
+    else:
+        recognised = np.zeros(len(chunk), dtype=bool)
+        categories = pd.Series(target.default_category, index=chunk.index)
+
+    refused = np.zeros(len(chunk), dtype=bool)
+    if signs != "unsigned":
+        incoming = (signed > 0 if signs == "credits-positive" else signed < 0).to_numpy()
+        if target.income_category is None:
+            # Nowhere to put money coming in, e.g. refunds in an expense export
+            refused = incoming
+        else:
+            categories = categories.mask(incoming & ~recognised, target.income_category)
+            # Refunds net against their spending category, reversals against income
+            is_income = (categories == target.income_category).to_numpy()
+            amounts = amounts.where(incoming == is_income, -amounts)
+
+    if "description" in chunk.columns:
+        descriptions = chunk["description"].fillna("").astype(str)
+    else:
+        descriptions = pd.Series("", index=chunk.index)
+
+    valid = (dates.notna() & amounts.notna()).values & ~refused
+    # Inserting in date order keeps the (date, ...) index appends local
+    order = np.argsort(dates.values[valid], kind="stable")
+    rows = pd.DataFrame({
+        # SQLite stores SQLAlchemy Date columns as ISO strings
+        "date": dates.values[valid][order].astype("datetime64[D]").astype(str),
+        "category": categories.values[valid][order],
+        "amount": amounts.values[valid][order].astype(np.float64),
+        "description": descriptions.values[valid][order]
+    })
+    return rows, int((~valid).sum())
+
+def insert_rows(connection, table, rows):
+    """Insert a normalised chunk with a single executemany"""
+    connection.exec_driver_sql(
+        f"INSERT INTO {table} (date, category, amount, description) VALUES (?, ?, ?, ?)",
+        list(rows.itertuples(index=False, name=None))
+    )
+
+def import_file(engine, target, source, fmt=None, chunksize=DEFAULT_CHUNKSIZE,
+                date_format=None, dayfirst=False, progress=None, signs=None):
+    """Stream ``source`` into ``target.table``, one transaction per chunk"""
+    fmt = fmt or detect_format(getattr(source, "name", source))
+    status = ImportProgress()
+    for chunk, fraction in iter_chunks(source, fmt, chunksize):
+        rows, rejected = normalize_chunk(chunk, target, date_format, dayfirst, signs)
+        if not rows.empty:
+            with engine.begin() as connection:
+                # Log the chunk's months for snapshots once rather than per row
+                with snapshots.untracked(connection, target.table) as tracked:
+                    insert_rows(connection, target.table, rows)
+                if tracked:
+                    snapshots.record_changes(connection, target.table, rows['date'].str[:7].unique())
+                if target.after_insert:
+                    target.after_insert(connection, rows)
+            # after_insert may maintain other tables, so drop every cached read
+            query_cache.invalidate(engine)
+        status.rows_read += len(chunk)
+        status.rows_imported += len(rows)
+        status.rows_rejected += rejected
+        status.fraction = fraction
+        if progress:
+            progress(status)
+    status.fraction = 1.0
+    return status
+
+def load_project(project_name):
+    """Import a tracker's app.py to reach its engine and import target"""
+    try:
+        module = load_project_module(project_name)
+    except FileNotFoundError as e:
+        raise SystemExit(str(e))
+    if not hasattr(module, "IMPORT_TARGET"):
+        raise SystemExit(f"{project_name} does not support bulk import")
+    return module
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import a CSV or Parquet file into a tracker")
+    parser.add_argument("project", help="expense_tracker or finance_tracker")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "parquet"])
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--date-format", help="strftime format of the date column, e.g. %%d/%%m/%%Y")
+    parser.add_argument("--dayfirst", action="store_true")
+    parser.add_argument("--signs", choices=list(SIGN_CONVENTIONS),
+                        help="sign convention of the amounts (default: the tracker's)")
+    args = parser.parse_args(argv)
+
+    module = load_project(args.project)
+
+    def report(status):
+        print(f"\r{status.fraction:6.1%}  {status.rows_imported:>10,} imported  "
+              f"{status.rows_rejected:>8,} rejected  {status.rows_per_s:>10,.0f} rows/s",
+              end="", file=sys.stderr)
+
+    status = import_file(
+        module.engine, module.IMPORT_TARGET, args.path, args.format, args.chunksize,
+        args.date_format, args.dayfirst, progress=report, signs=args.signs
+    )
+    print(file=sys.stderr)
+    print(f"Imported {status.rows_imported:,} rows ({status.rows_rejected:,} rejected) "
+          f"in {status.elapsed_s:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Read query results straight into typed DataFrame columns.
+
+``read_frame`` runs raw SQL through ``exec_driver_sql``, so the engine's
+cursor events (query instrumentation, benchmark counters) still fire, and
+fetches rows in chunks. Each chunk is transposed into per-column NumPy arrays right
+away, so no ORM objects or per-row dicts are ever built: dates become
+``datetime64``, numbers ``float64``/``int64`` and repeated strings are kept
+as integer codes until the final ``pandas.Categorical`` is assembled.
+"""
+from common.lazy_imports import lazy_import
+
+# Heavy dependencies are only imported when first used
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+DATE = "date"
+FLOAT = "float"
+INT = "int"
+BOOL = "bool"
+CATEGORY = "category"
+TEXT = "text"
+
+DEFAULT_CHUNKSIZE = 50_000
+
+class _Column:
+    def __init__(self):
+        self.chunks = []
+
+    def concatenated(self, dtype):
+        return np.concatenate(self.chunks) if self.chunks else np.array([], dtype=dtype)
+
+class _DateColumn(_Column):
+    def append(self, values):
+        # SQLite hands SQLAlchemy Date columns back as ISO strings
+        self.chunks.append(np.array(values, dtype="datetime64[D]"))
+
+    def finish(self):
+        return self.concatenated("datetime64[D]").astype("datetime64[ns]")
+
+class _FloatColumn(_Column):
+    def append(self, values):
+        self.chunks.append(np.array(values, dtype=np.float64))
+
+    def finish(self):
+        return self.concatenated(np.float64)
+
+class _IntColumn(_FloatColumn):
+    def finish(self):
+        values = super().finish()
+        if np.isnan(values).any():
+            return pd.array(values, dtype="Int64")
+        return values.astype(np.int64)
+
+class _BoolColumn(_FloatColumn):
+    def finish(self):
+        values = super().finish()
+        if np.isnan(values).any():
+            return pd.array(values, dtype="boolean")
+        return values.astype(bool)
+
+class _CategoryColumn(_Column):
+    def __init__(self):
+        super().__init__()
+        self.codes = {}
+
+    def _code(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+        return code
+
+    def append(self, values):
+        self.chunks.append(np.fromiter(map(self._code, values), dtype=np.int32, count=len(values)))
+
+    def finish(self):
+        return pd.Categorical.from_codes(self.concatenated(np.int32), categories=list(self.codes))
+
+class _TextColumn(_Column):
+    def append(self, values):
+        self.chunks.append(np.array(values, dtype=object))
+
+    def finish(self):
+        return self.concatenated(object)
+
+BUILDERS = {
+    DATE: _DateColumn,
+    FLOAT: _FloatColumn,
+    INT: _IntColumn,
+    BOOL: _BoolColumn,
+    CATEGORY: _CategoryColumn,
+    TEXT: _TextColumn,
+}
+
+def read_frame(engine, sql, params=(), columns=(), chunksize=DEFAULT_CHUNKSIZE):
+    """Run ``sql`` and build a DataFrame from ``columns``, a list of (name, kind)
+
+    The SELECT list must match ``columns`` in order. Dates in ``params``
+    must already be ISO strings.
+    """
+    builders = [BUILDERS[kind]() for _, kind in columns]
+    with engine.connect() as connection:
+        result = connection.exec_driver_sql(sql, tuple(params))
+        while True:
+            rows = result.fetchmany(chunksize)
+            if not rows:
+                break
+            for builder, values in zip(builders, zip(*rows)):
+                builder.append(values)
+    return pd.DataFrame(
+        {name: builder.finish() for (name, _), builder in zip(columns, builders)},
+        copy=False
+    )
@@ -0,0 +1,103 @@
+"""Bound the number of points sent to the browser for long time series.
+
+Line series are reduced with Largest-Triangle-Three-Buckets (LTTB), which
+keeps the visually significant peaks and troughs. Candlestick data is
+resampled to the finest OHLC bar width that fits the budget for the range
+being shown, so narrowing the range yields finer bars.
+"""
+import numpy as np
+import pandas as pd
+
+# Default upper bound on points per chart trace
+MAX_POINTS = 2000
+
+# Candidate OHLC bar widths, finest first, with their approximate length
+OHLC_RULES = [
+    ("1min", pd.Timedelta(minutes=1)),
+    ("5min", pd.Timedelta(minutes=5)),
+    ("15min", pd.Timedelta(minutes=15)),
+    ("1h", pd.Timedelta(hours=1)),
+    ("4h", pd.Timedelta(hours=4)),
+    ("1D", pd.Timedelta(days=1)),
+    ("W", pd.Timedelta(weeks=1)),
+    ("MS", pd.Timedelta(days=31)),
+    ("QS", pd.Timedelta(days=92)),
+    ("YS", pd.Timedelta(days=366)),
+]
+
+OHLC_AGGREGATES = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+def _numeric(values):
+    values = np.asarray(values)
+    if values.dtype == object and len(values) and not isinstance(values[0], (int, float, np.number)):
+        # datetime.date objects, as date columns read from SQLite come back
+        values = pd.to_datetime(values).to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+def lttb_indices(x, y, max_points=MAX_POINTS):
+    """Positions of the points LTTB keeps, always including the first and last"""
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = _numeric(x)
+    y = _numeric(y)
+
+    # Interior points split into max_points - 2 buckets of near-equal size
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = end, edges[bucket + 2]
+            next_x = x[next_start:next_end].mean()
+            next_y = y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Pick the point forming the largest triangle with the last kept
+        # point and the average of the next bucket
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+def lttb(frame, x, y, max_points=MAX_POINTS):
+    """Rows of ``frame`` kept by LTTB on column ``x`` against one or more ``y`` columns
+
+    Each ``y`` column is reduced on its non-missing rows and the kept rows
+    are merged, so a frame with several series stays within
+    ``len(y) * max_points`` rows.
+    """
+    columns = [y] if isinstance(y, str) else list(y)
+    if len(frame) <= max_points:
+        return frame
+    keep = []
+    for column in columns:
+        present = np.flatnonzero(frame[column].notna().to_numpy())
+        positions = lttb_indices(
+            frame[x].to_numpy()[present], frame[column].to_numpy()[present], max_points
+        )
+        keep.append(present[positions])
+    return frame.iloc[np.unique(np.concatenate(keep))]
+
+def ohlc_rule(start, end, max_points=MAX_POINTS):
+    """Finest bar width from OHLC_RULES giving at most ``max_points`` bars"""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for rule, width in OHLC_RULES:
+        if span / width <= max_points:
+            return rule
+    return OHLC_RULES[-1][0]
+
+def resample_ohlc(frame, max_points=MAX_POINTS):
+    """OHLC(V) frame on a DatetimeIndex, resampled to at most about ``max_points`` bars"""
+    if len(frame) <= max_points:
+        return frame
+    rule = ohlc_rule(frame.index[0], frame.index[-1], max_points)
+    aggregates = {column: how for column, how in OHLC_AGGREGATES.items() if column in frame}
+    return frame.resample(rule).agg(aggregates).dropna(subset=["Close"])
@@ -0,0 +1,207 @@
+"""Per-rerun instrumentation for the dashboard.
+
+A ``RerunTrace`` records how long the project module took to load, how long
+its ``main()`` ran, every SQL statement issued through a project's
+module-level ``engine``, every ``requests`` call and the time spent building
+and rendering plotly/matplotlib figures.
+
+Nothing is patched until tracing is first enabled, and hooks only record
+while a trace is active on the current thread, so a disabled dashboard pays
+nothing. Libraries loaded later, through ``lazy_import`` or by a project as
+it is loaded, are patched as soon as they arrive.
+"""
+import contextlib
+import functools
+import json
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from common import lazy_imports
+
+# Longest SQL text kept per statement
+MAX_STATEMENT_LENGTH = 300
+
+# Figure constructors and renderers that are timed once their module is imported
+FIGURE_HOOKS = {
+    "plotly.express": ["line", "bar", "pie", "scatter", "scatter_geo", "histogram", "area", "box"],
+    "seaborn": ["lineplot", "barplot", "scatterplot", "histplot", "heatmap"],
+    "matplotlib.pyplot": ["subplots", "figure"],
+    "streamlit": ["plotly_chart", "pyplot"],
+}
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_patched = set()
+_engines = weakref.WeakSet()
+
+class RerunTrace:
+    """Everything measured during one rerun of one project"""
+
+    def __init__(self, project):
+        self.project = project
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.load_ms = None
+        self.main_ms = None
+        self.queries = []
+        self.http_calls = []
+        self.figures = []
+        self._figure_depth = 0
+
+    def to_dict(self):
+        return {
+            "project": self.project,
+            "started_at": self.started_at,
+            "load_ms": self.load_ms,
+            "main_ms": self.main_ms,
+            "queries": self.queries,
+            "http_calls": self.http_calls,
+            "figures": self.figures
+        }
+
+    def summary(self):
+        return {
+            "load_ms": self.load_ms,
+            "main_ms": self.main_ms,
+            "sql_ms": sum(q["duration_ms"] for q in self.queries),
+            "http_ms": sum(c["duration_ms"] for c in self.http_calls),
+            "figure_ms": sum(f["duration_ms"] for f in self.figures)
+        }
+
+def current_trace():
+    """The trace active on this thread, if any"""
+    return getattr(_local, "trace", None)
+
+@contextlib.contextmanager
+def trace_rerun(project):
+    """Record everything that happens on this thread into a new trace"""
+    install()
+    trace = RerunTrace(project)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = None
+
+@contextlib.contextmanager
+def timed(trace, attribute):
+    """Store the elapsed milliseconds of the block on ``trace``; no-op without a trace"""
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(trace, attribute, (time.perf_counter() - started) * 1000)
+
+def install():
+    """Patch requests and any already-imported figure libraries (idempotent)
+
+    The first call also registers a lazy_imports hook, so libraries resolved
+    by a lazy proxy later on are patched before their first use.
+    """
+    with _install_lock:
+        if "lazy_imports" not in _patched:
+            lazy_imports.on_load(_on_lazy_load)
+            _patched.add("lazy_imports")
+        if "requests" not in _patched and "requests" in sys.modules:
+            _patch_requests(sys.modules["requests"])
+            _patched.add("requests")
+        for module_name, functions in FIGURE_HOOKS.items():
+            if module_name in _patched or module_name not in sys.modules:
+                continue
+            module = sys.modules[module_name]
+            for name in functions:
+                if hasattr(module, name):
+                    setattr(module, name, _timed_figure(module_name, name, getattr(module, name)))
+            _patched.add(module_name)
+        if "plotly.graph_objs.Figure" not in _patched and "plotly.graph_objs" in sys.modules:
+            figure_class = sys.modules["plotly.graph_objs"].Figure
+            figure_class.__init__ = _timed_figure("plotly.graph_objs", "Figure", figure_class.__init__)
+            _patched.add("plotly.graph_objs.Figure")
+
+def _on_lazy_load(name, module):
+    # Importing one module can pull in several hooked ones, e.g. plotly.express and plotly.graph_objs
+    install()
+
+def watch_module(module):
+    """Attach statement timing to the module's SQLAlchemy ``engine``, if it has one
+
+    Also patches any hooked library the module imported while loading.
+    """
+    install()
+    engine = getattr(module, "engine", None)
+    if engine is None or engine in _engines:
+        return
+    from sqlalchemy import event
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _engines.add(engine)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_trace() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace()
+    starts = conn.info.get("query_start")
+    if trace is None or not starts:
+        return
+    trace.queries.append({
+        "statement": " ".join(statement.split())[:MAX_STATEMENT_LENGTH],
+        "duration_ms": (time.perf_counter() - starts.pop()) * 1000,
+        "rows": cursor.rowcount
+    })
+
+def _patch_requests(requests):
+    original = requests.sessions.Session.request
+
+    @functools.wraps(original)
+    def request(self, method, url, *args, **kwargs):
+        trace = current_trace()
+        if trace is None:
+            return original(self, method, url, *args, **kwargs)
+        started = time.perf_counter()
+        status = None
+        try:
+            response = original(self, method, url, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            trace.http_calls.append({
+                "method": method,
+                "url": url,
+                "status": status,
+                "duration_ms": (time.perf_counter() - started) * 1000
+            })
+
+    requests.sessions.Session.request = request
+
+def _timed_figure(module_name, name, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        trace = current_trace()
+        # Only the outermost call is recorded, e.g. px.line building a go.Figure
+        if trace is None or trace._figure_depth:
+            return function(*args, **kwargs)
+        trace._figure_depth += 1
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            trace._figure_depth -= 1
+            trace.figures.append({
+                "call": f"{module_name}.{name}",
+                "duration_ms": (time.perf_counter() - started) * 1000
+            })
+    return wrapper
+
+def to_json_lines(traces):
+    return "".join(json.dumps(trace.to_dict()) + "\n" for trace in traces)
+
+def append_json_lines(path, trace):
+    with open(path, "a") as f:
+        f.write(json.dumps(trace.to_dict()) + "\n")
@@ -0,0 +1,69 @@
+"""Deferred imports for heavy project dependencies.
+
+``lazy_import("plotly.express")`` returns a stand-in that performs the real
+import the first time one of its attributes is used, so importing a
+project's app.py no longer pays for libraries it may never touch.
+"""
+import importlib
+import threading
+
+# Called with (name, module) whenever a proxy performs its import
+_load_hooks = []
+
+def on_load(hook):
+    """Call ``hook(name, module)`` each time a lazy module is first imported"""
+    _load_hooks.append(hook)
+
+class LazyModule:
+    """Module proxy that imports ``name`` on first attribute access"""
+
+    __slots__ = ("_name", "_module", "_lock")
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Import the wrapped module now and return it"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    for hook in list(_load_hooks):
+                        hook(self._name, module)
+                    self._module = module
+        return self._module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __dir__(self):
+        return dir(self.load())
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name):
+    """Return a proxy for module ``name`` that imports it on first use"""
+    return LazyModule(name)
+
+def lazy_modules(namespace):
+    """All lazy proxies defined at the top level of a module or dict"""
+    if not isinstance(namespace, dict):
+        namespace = vars(namespace)
+    return [value for value in namespace.values() if isinstance(value, LazyModule)]
+
+def preload(namespace):
+    """Import every lazy dependency declared by a module; returns the names loaded"""
+    loaded = []
+    for proxy in lazy_modules(namespace):
+        if not proxy.is_loaded:
+            proxy.load()
+            loaded.append(proxy._name)
+    return loaded
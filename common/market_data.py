@@ -0,0 +1,273 @@
+"""Shared, thread-safe cache of market data for the stock simulator.
+
+``QuoteCache`` keeps price history per (ticker, period, interval) for a
+configurable TTL. Concurrent requests for the same key wait on a single
+fetch instead of each hitting the network, and the latest close seen in any
+cached history serves ``last_price`` without another request. Tickers
+missing from the cache are fetched together in one bulk request when the
+cache is given a ``fetch_many`` function.
+
+History comes from a ``MarketDataProvider``: Yahoo Finance by default, or
+the memory-mapped local store in ``common.ohlcv_store`` when
+``MARKET_DATA_PROVIDER=local``, which needs no network access.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from common.lazy_imports import lazy_import
+
+# Heavy dependencies are only imported when first used
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+ohlcv_store = lazy_import("common.ohlcv_store")
+
+# Seconds a fetched history stays fresh
+TTL_ENV = "MARKET_DATA_TTL_S"
+DEFAULT_TTL_S = 60.0
+
+# Which provider serves history: "yfinance" or "local"
+PROVIDER_ENV = "MARKET_DATA_PROVIDER"
+DEFAULT_PROVIDER = "yfinance"
+
+# History requested when only the last price is needed
+LAST_PRICE_PERIOD = "5d"
+LAST_PRICE_INTERVAL = "1d"
+
+def default_ttl():
+    return float(os.environ.get(TTL_ENV, DEFAULT_TTL_S))
+
+def _naive_index(data):
+    """``data`` with a timezone-naive index in exchange-local time, as yf.download returns daily bars"""
+    if data is not None and getattr(data.index, "tz", None) is not None:
+        return data.tz_localize(None)
+    return data
+
+def _naive(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+def _last_close(data):
+    if data is None or data.empty or "Close" not in data:
+        return None
+    return float(data["Close"].iloc[-1])
+
+class MarketDataProvider:
+    """Source of OHLCV history frames on a DatetimeIndex"""
+
+    def history(self, ticker, period, interval):
+        """History of one ticker, or None if the provider has none"""
+        raise NotImplementedError
+
+    def history_many(self, tickers, period, interval):
+        """History per ticker; tickers without data are left out"""
+        histories = {ticker: self.history(ticker, period, interval) for ticker in tickers}
+        return {ticker: data for ticker, data in histories.items() if data is not None}
+
+class YFinanceProvider(MarketDataProvider):
+    """Live history from Yahoo Finance"""
+
+    def history(self, ticker, period, interval):
+        return _naive_index(yf.Ticker(ticker).history(period=period, interval=interval))
+
+    def download(self, tickers, period, interval):
+        """History per ticker from one bulk download, with intraday bars left in the exchange's timezone"""
+        tickers = list(tickers)
+        data = yf.download(tickers, period=period, interval=interval, group_by="ticker", progress=False)
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {tickers[0]: data}
+        available = set(data.columns.get_level_values(0))
+        return {ticker: data[ticker].dropna(how="all") for ticker in tickers if ticker in available}
+
+    def history_many(self, tickers, period, interval):
+        """History for several tickers from one bulk download"""
+        return {ticker: _naive_index(data) for ticker, data in self.download(tickers, period, interval).items()}
+
+class LocalStoreProvider(MarketDataProvider):
+    """History from the memory-mapped local store
+
+    Periods are counted back from the last stored bar, so reads are
+    deterministic. An interval that was never ingested falls back to the
+    finest stored interval coarser than it, or else the coarsest stored.
+    """
+
+    def __init__(self, directory=None):
+        self.store = ohlcv_store.OHLCVStore(directory)
+
+    def _interval(self, ticker, interval):
+        stored = self.store.intervals(ticker)
+        if not stored or interval in stored:
+            return interval if stored else None
+        order = ohlcv_store.INTERVALS
+        rank = order.index(interval) if interval in order else len(order)
+        coarser = [candidate for candidate in stored if order.index(candidate) > rank]
+        return coarser[0] if coarser else stored[-1]
+
+    def history(self, ticker, period, interval):
+        interval = self._interval(ticker, interval)
+        if interval is None:
+            return None
+        return self.store.frame(ticker, period, interval)
+
+PROVIDERS = {"yfinance": YFinanceProvider, "local": LocalStoreProvider}
+
+def get_provider(name=None):
+    """The provider named by ``name`` or MARKET_DATA_PROVIDER"""
+    name = name or os.environ.get(PROVIDER_ENV, DEFAULT_PROVIDER)
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown market data provider {name!r}; choose from {', '.join(PROVIDERS)}")
+
+class QuoteCache:
+    """TTL cache in front of ``fetch(ticker, period, interval)``, shared by every session
+
+    ``fetch_many(tickers, period, interval)``, if given, returns a dict of
+    frames for several tickers from one request. Cached frames are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, fetch, ttl_s=None, clock=time.monotonic, fetch_many=None):
+        self.fetch = fetch
+        self.fetch_many = fetch_many
+        self.ttl_s = default_ttl() if ttl_s is None else ttl_s
+        self.clock = clock
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}
+        # ticker -> (expires_at, price, as_of)
+        self._last_prices = {}
+
+    @staticmethod
+    def _key(ticker, period, interval):
+        return (ticker.strip().upper(), period, interval)
+
+    def _remember_last_price(self, ticker, data, expires_at):
+        price = _last_close(data)
+        if price is None:
+            return
+        # Other providers may still mix naive and tz-aware indexes
+        as_of = _naive(data.index[-1])
+        current = self._last_prices.get(ticker)
+        if current is None or current[0] <= self.clock() or as_of >= current[2]:
+            self._last_prices[ticker] = (expires_at, price, as_of)
+
+    def history(self, ticker, period="1mo", interval="1d"):
+        """Price history for the key, fetched at most once per TTL"""
+        key = self._key(ticker, period, interval)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                return entry[1]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+                self.fetches += 1
+        if not owner:
+            # Someone else is already fetching this key
+            return pending.result()
+
+        try:
+            data = self.fetch(*key)
+            with self._lock:
+                expires_at = self.clock() + self.ttl_s
+                self._entries[key] = (expires_at, data)
+                self._remember_last_price(key[0], data, expires_at)
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(data)
+            return data
+        finally:
+            # Never leave waiters blocked on a key nobody is fetching
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def last_price(self, ticker):
+        """Latest close for ``ticker``, or None if there is no data"""
+        symbol = ticker.strip().upper()
+        with self._lock:
+            entry = self._last_prices.get(symbol)
+            if entry is not None and entry[0] > self.clock():
+                return entry[1]
+        return _last_close(self.history(symbol, LAST_PRICE_PERIOD, LAST_PRICE_INTERVAL))
+
+    def history_many(self, tickers, period="1mo", interval="1d"):
+        """Price history per ticker, fetching every stale ticker in one request"""
+        keys = {ticker: self._key(ticker, period, interval) for ticker in tickers}
+        results, owned, waiting = {}, {}, {}
+        with self._lock:
+            now = self.clock()
+            for key in dict.fromkeys(keys.values()):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    results[key] = entry[1]
+                elif key in self._pending:
+                    waiting[key] = self._pending[key]
+                else:
+                    owned[key] = self._pending[key] = Future()
+            if owned:
+                self.fetches += 1 if self.fetch_many is not None else len(owned)
+
+        if owned:
+            symbols = [key[0] for key in owned]
+            try:
+                if self.fetch_many is not None:
+                    fetched = self.fetch_many(symbols, period, interval)
+                else:
+                    fetched = {symbol: self.fetch(symbol, period, interval) for symbol in symbols}
+                with self._lock:
+                    expires_at = self.clock() + self.ttl_s
+                    for key in owned:
+                        # Tickers the provider returned nothing for are cached as missing
+                        data = results[key] = fetched.get(key[0])
+                        self._entries[key] = (expires_at, data)
+                        self._remember_last_price(key[0], data, expires_at)
+            except Exception as e:
+                for pending in owned.values():
+                    pending.set_exception(e)
+                raise
+            else:
+                for key, pending in owned.items():
+                    pending.set_result(results[key])
+            finally:
+                # Never leave waiters blocked on keys nobody is fetching
+                with self._lock:
+                    for key in owned:
+                        self._pending.pop(key, None)
+
+        for key, pending in waiting.items():
+            results[key] = pending.result()
+        return {ticker: results[key] for ticker, key in keys.items()}
+
+    def last_prices(self, tickers):
+        """Latest close per ticker, in order, with None where there is no data"""
+        prices, stale = {}, []
+        with self._lock:
+            now = self.clock()
+            for ticker in tickers:
+                entry = self._last_prices.get(ticker.strip().upper())
+                if entry is not None and entry[0] > now:
+                    prices[ticker] = entry[1]
+                else:
+                    stale.append(ticker)
+        if stale:
+            histories = self.history_many(stale, LAST_PRICE_PERIOD, LAST_PRICE_INTERVAL)
+            for ticker, data in histories.items():
+                prices[ticker] = _last_close(data)
+        return [prices[ticker] for ticker in tickers]
+
+    def invalidate(self, ticker=None):
+        """Forget cached data for ``ticker``, or for every ticker"""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                self._last_prices.clear()
+                return
+            symbol = ticker.strip().upper()
+            self._entries = {k: v for k, v in self._entries.items() if k[0] != symbol}
+            self._last_prices.pop(symbol, None)
@@ -0,0 +1,63 @@
+"""Versioned schema migrations for the tracker databases.
+
+Each tracker declares an ordered list of ``Migration`` steps. At startup
+``apply_migrations`` runs every step newer than the version recorded in the
+database's ``schema_migrations`` table, inside a single write transaction,
+so running it repeatedly or from several processes at once is safe.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import text
+
+# ``steps`` is a list of SQL strings or callables taking a Connection
+Migration = namedtuple("Migration", ["version", "description", "steps"])
+
+def current_version(connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)"
+    )
+    return connection.exec_driver_sql(
+        "SELECT COALESCE(MAX(version), 0) FROM schema_migrations"
+    ).scalar()
+
+def apply_migrations(engine, migrations):
+    """Bring the database up to the newest migration; returns versions applied"""
+    applied = []
+    with engine.connect() as connection:
+        # Take the write lock up front so concurrent starters apply each step once
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            version = current_version(connection)
+            for migration in sorted(migrations, key=lambda m: m.version):
+                if migration.version <= version:
+                    continue
+                for step in migration.steps:
+                    if callable(step):
+                        step(connection)
+                    else:
+                        connection.exec_driver_sql(step)
+                connection.execute(
+                    text("INSERT INTO schema_migrations (version, description, applied_at) "
+                         "VALUES (:version, :description, :applied_at)"),
+                    {
+                        "version": migration.version,
+                        "description": migration.description,
+                        "applied_at": datetime.now().isoformat(timespec="seconds")
+                    }
+                )
+                applied.append(migration.version)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    return applied
+
+def add_column(table, column, definition):
+    """Migration step adding ``column`` unless create_all already created it"""
+    def step(connection):
+        existing = [row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")]
+        if column not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
@@ -0,0 +1,213 @@
+"""Memory-mapped local store of OHLCV history.
+
+Each ticker and bar interval lives under ``<store dir>/<TICKER>/<interval>/``
+as one raw little-endian file per column: ``timestamp.i8`` (UTC nanoseconds)
+and ``Open.f8`` ... ``Volume.f8``. Every ingest path converts timezone-aware
+bars to UTC; naive bars, such as the daily dates yfinance returns, are
+taken to be UTC already. Reads memory-map the files and cut date
+ranges with a binary search on the timestamps, so slices are views into the
+map rather than copies. Ingestion only appends bars newer than the last one
+stored, and writes the timestamp column last so readers never see a row
+before its values.
+
+    python -m common.ohlcv_store ingest AAPL MSFT GOOGL --period 5y
+    python -m common.ohlcv_store ingest AAPL --csv aapl.csv
+    python -m common.ohlcv_store info
+"""
+import argparse
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Root directory of the store; defaults to ./market_data
+STORE_DIR_ENV = "MARKET_DATA_DIR"
+DEFAULT_STORE_DIR = "market_data"
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+TIMESTAMP_FILE = "timestamp.i8"
+TIMESTAMP_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f8")
+
+# Calendar days covered by each yfinance-style period, counted back from the last bar
+PERIOD_DAYS = {"1d": 1, "5d": 7, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366,
+               "2y": 731, "5y": 1827, "10y": 3653, "max": None}
+
+# Bar intervals from finest to coarsest
+INTERVALS = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h", "1d", "5d", "1wk", "1mo", "3mo"]
+
+# Columns are read-only views sharing the memory map; ``timestamp`` is datetime64[ns]
+Bars = namedtuple("Bars", ("timestamp",) + COLUMNS)
+
+def store_root(directory=None):
+    return Path(directory or os.environ.get(STORE_DIR_ENV, DEFAULT_STORE_DIR))
+
+def _empty_bars():
+    return Bars(np.empty(0, dtype="datetime64[ns]"), *(np.empty(0, dtype=VALUE_DTYPE) for _ in COLUMNS))
+
+class OHLCVStore:
+    """Per-ticker OHLCV files, memory-mapped on read and appended on ingest"""
+
+    def __init__(self, directory=None):
+        self.root = store_root(directory)
+        self._lock = threading.Lock()
+        # (ticker, interval) -> (rows, Bars)
+        self._maps = {}
+
+    def path(self, ticker, interval="1d"):
+        return self.root / ticker.strip().upper() / interval
+
+    def tickers(self):
+        if not self.root.is_dir():
+            return []
+        return sorted(entry.name for entry in self.root.iterdir() if entry.is_dir())
+
+    def intervals(self, ticker):
+        directory = self.root / ticker.strip().upper()
+        if not directory.is_dir():
+            return []
+        stored = {entry.name for entry in directory.iterdir() if (entry / TIMESTAMP_FILE).exists()}
+        return [interval for interval in INTERVALS if interval in stored]
+
+    @staticmethod
+    def _rows(directory):
+        try:
+            return os.stat(directory / TIMESTAMP_FILE).st_size // TIMESTAMP_DTYPE.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def bars(self, ticker, interval="1d"):
+        """Every stored bar, memory-mapped; remapped when an append adds rows"""
+        key = (ticker.strip().upper(), interval)
+        directory = self.path(ticker, interval)
+        rows = self._rows(directory)
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None and cached[0] == rows:
+                return cached[1]
+        if rows == 0:
+            bars = _empty_bars()
+        else:
+            timestamp = np.memmap(directory / TIMESTAMP_FILE, dtype=TIMESTAMP_DTYPE, mode="r", shape=(rows,))
+            bars = Bars(timestamp.view("datetime64[ns]"), *(
+                np.memmap(directory / f"{column}.f8", dtype=VALUE_DTYPE, mode="r", shape=(rows,))
+                for column in COLUMNS
+            ))
+        with self._lock:
+            self._maps[key] = (rows, bars)
+        return bars
+
+    def slice(self, ticker, interval="1d", start=None, end=None):
+        """Bars with ``start <= timestamp < end``, as views into the memory map"""
+        bars = self.bars(ticker, interval)
+        timestamp = bars.timestamp
+        lo = 0 if start is None else np.searchsorted(timestamp, np.datetime64(start, "ns"), "left")
+        hi = len(timestamp) if end is None else np.searchsorted(timestamp, np.datetime64(end, "ns"), "left")
+        return Bars(*(column[lo:hi] for column in bars))
+
+    def period(self, ticker, period="1mo", interval="1d"):
+        """Bars covering ``period`` up to the last stored bar"""
+        bars = self.bars(ticker, interval)
+        days = PERIOD_DAYS.get(period)
+        if days is None or len(bars.timestamp) == 0:
+            return bars
+        start = bars.timestamp[-1] - np.timedelta64(days, "D")
+        lo = np.searchsorted(bars.timestamp, start, "right")
+        return Bars(*(column[lo:] for column in bars))
+
+    def frame(self, ticker, period="1mo", interval="1d"):
+        """The period's bars as a DataFrame on a DatetimeIndex (copies the slice)"""
+        bars = self.period(ticker, period, interval)
+        return pd.DataFrame(
+            {column: np.array(getattr(bars, column)) for column in COLUMNS},
+            index=pd.DatetimeIndex(np.array(bars.timestamp), name="Date")
+        )
+
+    def append(self, ticker, interval, frame):
+        """Append the bars of ``frame`` newer than the last stored one; returns rows written
+
+        A timezone-aware index is converted to UTC; a naive one must already be UTC.
+        """
+        if frame is None or frame.empty:
+            return 0
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        frame = frame.set_axis(index).sort_index()
+        frame = frame[~frame.index.duplicated(keep="last")]
+
+        directory = self.path(ticker, interval)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            rows = self._rows(directory)
+            if rows:
+                last = np.memmap(directory / TIMESTAMP_FILE, dtype=TIMESTAMP_DTYPE, mode="r",
+                                 offset=(rows - 1) * TIMESTAMP_DTYPE.itemsize, shape=(1,))[0]
+                frame = frame[frame.index.asi8 > last]
+            if frame.empty:
+                return 0
+            # Drop the tail of an append that was interrupted before its timestamps landed
+            for column in COLUMNS:
+                path = directory / f"{column}.f8"
+                if path.exists() and path.stat().st_size > rows * VALUE_DTYPE.itemsize:
+                    os.truncate(path, rows * VALUE_DTYPE.itemsize)
+            for column in COLUMNS:
+                values = frame[column] if column in frame else pd.Series(np.nan, index=frame.index)
+                with open(directory / f"{column}.f8", "ab") as f:
+                    f.write(values.to_numpy(dtype=VALUE_DTYPE).tobytes())
+            timestamp_path = directory / TIMESTAMP_FILE
+            if timestamp_path.exists():
+                os.truncate(timestamp_path, rows * TIMESTAMP_DTYPE.itemsize)
+            with open(timestamp_path, "ab") as f:
+                f.write(frame.index.asi8.astype(TIMESTAMP_DTYPE).tobytes())
+        return len(frame)
+
+def _read_csv(path):
+    frame = pd.read_csv(path)
+    date_column = next(column for column in frame.columns if column.lower() in ("date", "datetime", "timestamp"))
+    frame.index = pd.to_datetime(frame.pop(date_column), utc=True)
+    return frame.rename(columns={column: column.title() for column in frame.columns})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest and inspect the local OHLCV store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Append new bars for tickers")
+    ingest.add_argument("tickers", nargs="+")
+    ingest.add_argument("--period", default="1y", help="History to download (default 1y)")
+    ingest.add_argument("--interval", default="1d")
+    ingest.add_argument("--csv", help="Read bars for a single ticker from a CSV file instead of Yahoo Finance")
+    ingest.add_argument("--dir", help=f"Store directory (default ${STORE_DIR_ENV} or ./market_data)")
+    info = commands.add_parser("info", help="List stored tickers and their ranges")
+    info.add_argument("--dir")
+    args = parser.parse_args(argv)
+
+    store = OHLCVStore(args.dir)
+    if args.command == "ingest":
+        started = time.perf_counter()
+        tickers = [ticker.strip().upper() for ticker in args.tickers]
+        if args.csv:
+            if len(tickers) != 1:
+                parser.error("--csv takes exactly one ticker")
+            frames = {tickers[0]: _read_csv(args.csv)}
+        else:
+            from common.market_data import YFinanceProvider
+            # Not history_many, which drops the timezone that append needs to convert to UTC
+            frames = YFinanceProvider().download(tickers, args.period, args.interval)
+        for ticker in tickers:
+            rows = store.append(ticker, args.interval, frames.get(ticker))
+            print(f"{ticker} {args.interval}: {rows:,} new bar(s)")
+        print(f"Ingested in {time.perf_counter() - started:.1f}s")
+    else:
+        for ticker in store.tickers():
+            for interval in store.intervals(ticker):
+                bars = store.bars(ticker, interval)
+                if len(bars.timestamp):
+                    print(f"{ticker} {interval}: {len(bars.timestamp):,} bars "
+                          f"{bars.timestamp[0]} .. {bars.timestamp[-1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Importing project apps outside the dashboard (CLIs, benchmarks)"""
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def load_project_module(project_name):
+    """Import ``<project>/app.py`` as ``projects.<project>``, like the dashboard does"""
+    module_path = ROOT / project_name / "app.py"
+    if not module_path.exists():
+        raise FileNotFoundError(f"Unknown project: {project_name}")
+    module_name = f"projects.{project_name}"
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        sys.modules.pop(module_name, None)
+        raise
+    return module
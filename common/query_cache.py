@@ -0,0 +1,165 @@
+"""Process-wide cache of tracker read results, keyed on table data versions.
+
+Read functions are wrapped with ``cached(engine, *tables)``. A result is
+served from memory until one of its tables changes: the trackers' write
+functions call ``invalidate(engine, *tables)``, and writes from other
+connections or processes are noticed through SQLite's ``PRAGMA
+data_version`` on a dedicated watcher connection. Entries are evicted least
+recently used first once the cache exceeds its memory budget. None results
+are never stored, so a reader can return None for "not available yet", such
+as a snapshot that has not been exported, and be retried on the next call.
+"""
+import collections
+import functools
+import os
+import sqlite3
+import sys
+import threading
+
+# Memory budget for cached results, in megabytes
+MAX_MB_ENV = "TRACKER_CACHE_MB"
+DEFAULT_MAX_MB = 256
+
+# Set to 0 to skip the data_version check and trust in-process invalidation only
+WATCH_ENV = "TRACKER_CACHE_WATCH"
+
+def estimate_size(value):
+    """Approximate bytes held by a cached value"""
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(key) + estimate_size(item) for key, item in value.items()
+        )
+    return sys.getsizeof(value)
+
+def _detached(value):
+    """A copy callers may modify without touching the cached value"""
+    if hasattr(value, "copy") and hasattr(value, "memory_usage"):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_detached(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _detached(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_detached(item) for item in value]
+    return value
+
+class QueryCache:
+    """LRU cache of read results, invalidated per database table"""
+
+    def __init__(self, max_bytes, watch_external=True):
+        self.max_bytes = max_bytes
+        self.watch_external = watch_external
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        # database -> {table -> version}; the None table covers the whole database
+        self._versions = collections.defaultdict(lambda: collections.defaultdict(int))
+        self._watchers = {}
+
+    def _check_external(self, database):
+        """Bump the database-wide version if another connection has committed"""
+        watcher = self._watchers.get(database)
+        if watcher is None:
+            connection = sqlite3.connect(database, check_same_thread=False)
+            watcher = self._watchers[database] = [connection, None]
+        data_version = watcher[0].execute("PRAGMA data_version").fetchone()[0]
+        if watcher[1] is not None and data_version != watcher[1]:
+            self._versions[database][None] += 1
+        watcher[1] = data_version
+
+    def versions(self, database, tables):
+        with self._lock:
+            if self.watch_external:
+                self._check_external(database)
+            versions = self._versions[database]
+            return (versions[None],) + tuple(versions[table] for table in tables)
+
+    def invalidate(self, database, *tables):
+        """Mark ``tables`` (or the whole database when none are given) as changed"""
+        with self._lock:
+            versions = self._versions[database]
+            for table in tables or (None,):
+                versions[table] += 1
+
+    def get_or_compute(self, key, versions, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _detached(entry[1])
+            self.misses += 1
+        value = compute()
+        if value is None:
+            return None
+        size = estimate_size(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            if size <= self.max_bytes:
+                self._entries[key] = (versions, value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return _detached(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+# Shared by every session and tracker in the process
+cache = QueryCache(
+    int(float(os.environ.get(MAX_MB_ENV, DEFAULT_MAX_MB)) * 1024 * 1024),
+    watch_external=os.environ.get(WATCH_ENV, "1") != "0"
+)
+
+def _database(engine):
+    return engine.url.database
+
+def invalidate(engine, *tables):
+    """Drop cached reads of ``tables`` in the engine's database; all of them when none are given"""
+    cache.invalidate(_database(engine), *tables)
+
+def versions(engine, *tables):
+    """Current data versions of ``tables``; changes whenever one of them is written"""
+    return cache.versions(_database(engine), tables)
+
+def cached(engine, *tables):
+    """Cache a read function's results until one of ``tables`` is written
+
+    Calls with unhashable arguments bypass the cache. DataFrames are copied
+    on the way out so callers can modify what they get back.
+    """
+    database = _database(engine)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            versions = cache.versions(database, tables)
+            return cache.get_or_compute(key, versions, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,157 @@
+"""Monte Carlo risk of a stock portfolio.
+
+Paths are generated from historical daily log returns, either as
+correlated geometric Brownian motion (drift and Cholesky-factored
+covariance estimated from history) or by a moving-block bootstrap that
+draws runs of consecutive historical days, which keeps the cross-sectional
+correlation, fat tails and short-range volatility clustering. Paths are
+built in blocks sized to a memory budget. Large runs are split into chunks
+across a process pool, each with an independent random stream. A chunk
+returns only its terminal P&L and a small sample of paths for the fan
+chart.
+
+Paths are sampled at the fan chart checkpoints only. For GBM the sum of
+daily increments between two checkpoints is itself normal, so this is exact
+at every checkpoint; the bootstrap's blocks span one checkpoint interval,
+drawn from precomputed rolling sums of the history.
+"""
+import math
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("gbm", "bootstrap")
+CONFIDENCE_LEVELS = (0.95, 0.99)
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Working memory per block of paths, and paths kept for the fan chart
+BLOCK_MB = 64
+FAN_PATHS = 20_000
+DEFAULT_STEPS = 50
+
+# Paths per process-pool chunk; smaller runs stay in this process
+CHUNK_PATHS = 100_000
+
+RiskResult = namedtuple("RiskResult", ["initial_value", "pnl", "var", "cvar", "fan"])
+
+def log_returns(close):
+    """Daily log returns of a (bars x tickers) close array, over the bars where every ticker traded"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(close), axis=0)
+    return returns[np.isfinite(returns).all(axis=1)]
+
+def cholesky(cov):
+    """Cholesky factor of a covariance matrix, adding jitter if it is not positive definite"""
+    jitter = 0.0
+    scale = max(np.trace(cov) / len(cov), 1e-12)
+    for _ in range(10):
+        try:
+            return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            jitter = scale * 1e-10 if jitter == 0 else jitter * 10
+    raise ValueError("Covariance of the returns is not positive definite")
+
+def checkpoints(horizon, steps=DEFAULT_STEPS):
+    """Days at which paths are recorded, ending on the horizon"""
+    return np.unique(np.linspace(0, horizon, min(steps, horizon) + 1).round().astype(np.int64))[1:]
+
+def _block_paths(checkpoint_count, assets):
+    """Paths per block that keep the block's working arrays within BLOCK_MB"""
+    return max(1, (BLOCK_MB * 2 ** 20) // (checkpoint_count * assets * 8 * 3))
+
+def rolling_sums(returns, length):
+    """Sums of every run of ``length`` consecutive days of returns"""
+    if length > len(returns):
+        raise ValueError(f"Need more than {length} days of returns to bootstrap {length}-day blocks")
+    total = np.cumsum(returns, axis=0)
+    sums = total[length - 1:].copy()
+    sums[1:] -= total[:-length]
+    return sums
+
+def _simulate_chunk(method, paths, seed, values0, returns, mu, chol, days, fan_paths):
+    """Terminal P&L of ``paths`` paths and the first ``fan_paths`` of them at every checkpoint"""
+    rng = np.random.default_rng(seed)
+    steps = np.diff(days, prepend=0)
+    assets = len(values0)
+    pnl = np.empty(paths)
+    fan = np.empty((fan_paths, len(days)))
+    if method == "bootstrap":
+        blocks = {length: (np.flatnonzero(steps == length), rolling_sums(returns, length))
+                  for length in np.unique(steps)}
+
+    block = _block_paths(len(days), assets)
+    done = 0
+    while done < paths:
+        size = min(block, paths - done)
+        if method == "gbm":
+            increments = (rng.standard_normal((size * len(days), assets)) @ chol.T).reshape(size, len(days), assets)
+            increments *= np.sqrt(steps)[:, None]
+            increments += steps[:, None] * mu
+        elif len(blocks) == 1:
+            (_, sums), = blocks.values()
+            increments = sums[rng.integers(len(sums), size=(size, len(days)))]
+        else:
+            increments = np.empty((size, len(days), assets))
+            for columns, sums in blocks.values():
+                increments[:, columns] = sums[rng.integers(len(sums), size=(size, len(columns)))]
+        np.cumsum(increments, axis=1, out=increments)
+        values = np.exp(increments, out=increments) @ values0
+        pnl[done:done + size] = values[:, -1] - values0.sum()
+        if done < fan_paths:
+            keep = min(size, fan_paths - done)
+            fan[done:done + keep] = values[:keep]
+        done += size
+    return pnl, fan
+
+def simulate(values0, returns, horizon=250, paths=100_000, method="gbm", steps=DEFAULT_STEPS,
+             seed=None, processes=None):
+    """Simulate portfolio value over ``horizon`` days
+
+    ``values0`` is the current market value per position and ``returns`` the
+    (days x positions) daily log returns. VaR and CVaR are reported as
+    positive losses at each of CONFIDENCE_LEVELS; the fan chart holds
+    FAN_PERCENTILES of portfolio value at each checkpoint day.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; choose from {', '.join(METHODS)}")
+    values0 = np.asarray(values0, dtype=np.float64)
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.ndim != 2 or returns.shape[1] != len(values0) or len(returns) < 2:
+        raise ValueError("Need at least two days of returns for every position")
+
+    mu = returns.mean(axis=0)
+    chol = cholesky(np.atleast_2d(np.cov(returns, rowvar=False)))
+    days = checkpoints(horizon, steps)
+
+    chunks = [CHUNK_PATHS] * (paths // CHUNK_PATHS) + ([paths % CHUNK_PATHS] if paths % CHUNK_PATHS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    fan_paths = [math.ceil(min(FAN_PATHS, paths) * size / paths) for size in chunks]
+    tasks = [(method, size, chunk_seed, values0, returns, mu, chol, days, fan)
+             for size, chunk_seed, fan in zip(chunks, seeds, fan_paths)]
+
+    workers = processes or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        results = [_simulate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*tasks)))
+
+    pnl = np.concatenate([chunk_pnl for chunk_pnl, _ in results])
+    sample = np.concatenate([chunk_fan for _, chunk_fan in results])
+    var, cvar = {}, {}
+    for level in CONFIDENCE_LEVELS:
+        cutoff = np.quantile(pnl, 1 - level)
+        var[level] = float(-cutoff)
+        cvar[level] = float(-pnl[pnl <= cutoff].mean())
+    fan = pd.DataFrame(
+        np.percentile(sample, FAN_PERCENTILES, axis=0).T,
+        index=pd.Index(days, name="day"),
+        columns=[f"p{percentile}" for percentile in FAN_PERCENTILES]
+    )
+    fan.loc[0] = values0.sum()
+    return RiskResult(float(values0.sum()), pnl, var, cvar, fan.sort_index())
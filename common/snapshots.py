@@ -0,0 +1,358 @@
+"""Partitioned Parquet snapshots of the tracker tables.
+
+Each tracker lists the tables it snapshots in ``SNAPSHOT_TABLES``. Export
+writes one Parquet file per table and month under
+``<snapshot dir>/<database>/<table>/month=YYYY-MM/`` with column
+statistics, so analytics tools can prune by partition and row group.
+Triggers installed by ``change_tracking_steps`` record the months every
+write touches in ``snapshot_changes``; later exports rewrite only those
+months. Restore bulk-inserts a table back from its snapshot.
+
+    python -m common.snapshots export
+    python -m common.snapshots export expense_tracker --full
+    python -m common.snapshots restore finance_tracker --dir /backups/snapshots
+"""
+import argparse
+import contextlib
+import functools
+import json
+import operator
+import os
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer
+
+from common import query_cache
+from common.projects import load_project_module
+
+# Root directory of the snapshots; defaults to ./snapshots
+SNAPSHOT_DIR_ENV = "TRACKER_SNAPSHOT_DIR"
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+# Partition for rows whose partition column is NULL
+NO_PARTITION = "none"
+RESTORE_BATCH_SIZE = 50_000
+MANIFEST = "_manifest.json"
+
+PROJECTS = ["expense_tracker", "finance_tracker", "task_manager", "health_fitness_tracker"]
+
+# ``table`` is the SQLAlchemy Table; rows are split by month of ``partition_column``
+SnapshotTable = namedtuple("SnapshotTable", ["table", "partition_column"])
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet snapshots require pyarrow: pip install pyarrow")
+    return pyarrow
+
+def _partition_sql(reference, column):
+    return f"COALESCE(strftime('%Y-%m', {reference}.{column}), '{NO_PARTITION}')"
+
+# Row references whose partitions each kind of write changes
+TRACKED_EVENTS = {"INSERT": ["NEW"], "UPDATE": ["OLD", "NEW"], "DELETE": ["OLD"]}
+
+def _trigger_name(table_name, event):
+    return f"{table_name}_snapshot_{event.lower()}"
+
+def change_tracking_steps(table_name, partition_column):
+    """Migration steps that log the month of every row written to ``table_name``"""
+    steps = [
+        "CREATE TABLE IF NOT EXISTS snapshot_changes ("
+        "table_name TEXT NOT NULL, partition TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 1, "
+        "PRIMARY KEY (table_name, partition))"
+    ]
+    for event, references in TRACKED_EVENTS.items():
+        body = " ".join(
+            f"INSERT INTO snapshot_changes (table_name, partition) "
+            f"VALUES ('{table_name}', {_partition_sql(reference, partition_column)}) "
+            f"ON CONFLICT (table_name, partition) DO UPDATE SET version = version + 1;"
+            for reference in references
+        )
+        steps.append(
+            f"CREATE TRIGGER IF NOT EXISTS {_trigger_name(table_name, event)} "
+            f"AFTER {event} ON {table_name} BEGIN {body} END"
+        )
+    return steps
+
+def record_changes(connection, table_name, partitions):
+    """Log ``partitions`` of ``table_name`` as changed, as the triggers would"""
+    connection.exec_driver_sql(
+        "INSERT INTO snapshot_changes (table_name, partition) VALUES (?, ?) "
+        "ON CONFLICT (table_name, partition) DO UPDATE SET version = version + 1",
+        [(table_name, partition or NO_PARTITION) for partition in partitions]
+    )
+
+@contextlib.contextmanager
+def untracked(connection, table_name):
+    """Drop the change-logging triggers of ``table_name`` for the rest of a transaction block
+
+    For bulk writes that log their partitions once with ``record_changes``
+    instead of once per row. pysqlite autocommits DDL issued outside a
+    transaction, so one is begun with the write lock held if the block has
+    not started one yet: the drop then rolls back with the block, and no
+    other writer can commit unlogged rows while the triggers are gone. The
+    triggers are recreated on exit, even if the block raises.
+    """
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    names = [_trigger_name(table_name, event) for event in TRACKED_EVENTS]
+    triggers = connection.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN (?, ?, ?)", tuple(names)
+    ).fetchall()
+    for name, _ in triggers:
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    try:
+        yield bool(triggers)
+    finally:
+        for _, sql in triggers:
+            connection.exec_driver_sql(sql)
+
+def snapshot_root(directory=None):
+    return Path(directory or os.environ.get(SNAPSHOT_DIR_ENV, DEFAULT_SNAPSHOT_DIR))
+
+def table_directory(engine, spec, directory=None):
+    """Where ``spec.table`` of the engine's database is snapshotted"""
+    return snapshot_root(directory) / Path(engine.url.database).stem / spec.table.name
+
+def read_manifest(path):
+    try:
+        return json.loads((path / MANIFEST).read_text())
+    except FileNotFoundError:
+        return None
+
+def _arrow_type(pa, column):
+    for sql_type, arrow_type in (
+        (DateTime, pa.timestamp("us")),
+        (Date, pa.date32()),
+        (Boolean, pa.bool_()),
+        (Integer, pa.int64()),
+        (Float, pa.float64()),
+    ):
+        if isinstance(column.type, sql_type):
+            return arrow_type
+    return pa.string()
+
+def _to_arrow(pa, spec, rows):
+    """Arrow table from SQLite rows, which hold dates as ISO strings and booleans as ints"""
+    columns = list(spec.table.columns)
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = []
+    for column, column_values in zip(columns, values):
+        arrow_type = _arrow_type(pa, column)
+        if pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type):
+            array = pa.array(column_values, pa.string()).cast(arrow_type)
+        elif pa.types.is_boolean(arrow_type):
+            array = pa.array(column_values, pa.int64()).cast(arrow_type)
+        else:
+            array = pa.array(column_values, arrow_type)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=[column.name for column in columns])
+
+def _month_bounds(partition):
+    year, month = map(int, partition.split("-"))
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def _read_partition(connection, spec, partition):
+    column = spec.partition_column
+    names = ", ".join(c.name for c in spec.table.columns)
+    if partition == NO_PARTITION:
+        where, params = f"{column} IS NULL", ()
+    else:
+        where, params = f"{column} >= ? AND {column} < ?", _month_bounds(partition)
+    return connection.exec_driver_sql(
+        f"SELECT {names} FROM {spec.table.name} WHERE {where} ORDER BY {column}, rowid", params
+    ).fetchall()
+
+def _write_partition(pa, path, table):
+    path.mkdir(parents=True, exist_ok=True)
+    temporary = path / "part-0.parquet.tmp"
+    pa.parquet.write_table(table, temporary, compression="zstd", write_statistics=True)
+    os.replace(temporary, path / "part-0.parquet")
+
+def _remove_partition(path):
+    for file in path.glob("*.parquet"):
+        file.unlink()
+    if path.exists() and not any(path.iterdir()):
+        path.rmdir()
+
+def export_table(engine, spec, directory=None, full=False):
+    """Write the months of ``spec.table`` changed since the last export; returns the manifest
+
+    The first export of a table, or any export with ``full``, rewrites every
+    month. Change-log entries are cleared only if no write has touched their
+    month since it was read, so concurrent writes are picked up next time.
+    """
+    pa = _pyarrow()
+    name = spec.table.name
+    path = table_directory(engine, spec, directory)
+    manifest = None if full else read_manifest(path)
+    partitions = dict(manifest["partitions"]) if manifest else {}
+
+    with engine.connect() as connection:
+        # One read transaction so every partition comes from the same state
+        connection.exec_driver_sql("BEGIN")
+        changes = dict(connection.exec_driver_sql(
+            "SELECT partition, version FROM snapshot_changes WHERE table_name = ?", (name,)
+        ).fetchall())
+        if manifest is None:
+            months = {row[0] for row in connection.exec_driver_sql(
+                f"SELECT DISTINCT {_partition_sql(name, spec.partition_column)} FROM {name}"
+            )}
+            months |= {p.name.split("=", 1)[1] for p in path.glob("month=*")}
+        else:
+            months = set(changes)
+
+        for month in sorted(months):
+            rows = _read_partition(connection, spec, month)
+            partition_path = path / f"month={month}"
+            if rows:
+                _write_partition(pa, partition_path, _to_arrow(pa, spec, rows))
+                partitions[month] = {"rows": len(rows)}
+            else:
+                _remove_partition(partition_path)
+                partitions.pop(month, None)
+        connection.rollback()
+
+        if changes:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            connection.exec_driver_sql(
+                "DELETE FROM snapshot_changes WHERE table_name = ? AND partition = ? AND version = ?",
+                [(name, month, version) for month, version in changes.items()]
+            )
+            connection.commit()
+    query_cache.invalidate(engine, "snapshot_changes")
+
+    manifest = {
+        "table": name,
+        "partition_column": spec.partition_column,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": sum(p["rows"] for p in partitions.values()),
+        "partitions": dict(sorted(partitions.items())),
+        "written": sorted(months),
+    }
+    path.mkdir(parents=True, exist_ok=True)
+    (path / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+def _from_arrow(pa, array):
+    """Python values SQLite stores the way SQLAlchemy writes them"""
+    if pa.types.is_date(array.type) or pa.types.is_timestamp(array.type):
+        array = array.cast(pa.string())
+    elif pa.types.is_boolean(array.type):
+        array = array.cast(pa.int64())
+    if array.null_count and not pa.types.is_string(array.type):
+        # NumPy would turn missing numbers into NaN rather than None
+        return array.to_pylist()
+    return array.to_numpy(zero_copy_only=False).tolist()
+
+def restore_table(engine, spec, directory=None):
+    """Replace ``spec.table`` with its snapshot in one transaction; returns rows restored"""
+    pa = _pyarrow()
+    path = table_directory(engine, spec, directory)
+    if read_manifest(path) is None:
+        raise FileNotFoundError(f"No snapshot of {spec.table.name} in {path}")
+    names = [column.name for column in spec.table.columns]
+    dataset = pa.dataset.dataset(path, format="parquet", partitioning="hive")
+    statement = (
+        f"INSERT INTO {spec.table.name} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' * len(names))})"
+    )
+    restored = 0
+    with engine.begin() as connection, untracked(connection, spec.table.name):
+        connection.exec_driver_sql(f"DELETE FROM {spec.table.name}")
+        for batch in dataset.to_batches(columns=names, batch_size=RESTORE_BATCH_SIZE):
+            columns = [_from_arrow(pa, batch.column(i)) for i in range(batch.num_columns)]
+            connection.exec_driver_sql(statement, list(zip(*columns)))
+            restored += batch.num_rows
+        # The table now matches the snapshot
+        connection.exec_driver_sql(
+            "DELETE FROM snapshot_changes WHERE table_name = ?", (spec.table.name,)
+        )
+    query_cache.invalidate(engine)
+    return restored
+
+def read_snapshot(engine, spec, start_date=None, end_date=None, columns=None, directory=None):
+    """Snapshot rows with the partition column between the dates, as a DataFrame
+
+    Returns None when there is no snapshot or when any month in the range has
+    writes that have not been exported yet, so callers can fall back to
+    SQLite.
+    """
+    path = table_directory(engine, spec, directory)
+    if read_manifest(path) is None:
+        return None
+    first = start_date.strftime("%Y-%m") if start_date else None
+    last = end_date.strftime("%Y-%m") if end_date else None
+    with engine.connect() as connection:
+        pending = [row[0] for row in connection.exec_driver_sql(
+            "SELECT partition FROM snapshot_changes WHERE table_name = ?", (spec.table.name,)
+        )]
+    if any((first is None or month >= first) and (last is None or month <= last) for month in pending):
+        return None
+
+    pa = _pyarrow()
+    field = pa.dataset.field
+    # Month bounds prune whole partitions; date bounds filter within them
+    tests = []
+    if start_date:
+        tests += [field("month") >= first, field(spec.partition_column) >= start_date]
+    if end_date:
+        tests += [field("month") <= last, field(spec.partition_column) <= end_date]
+    condition = functools.reduce(operator.and_, tests) if tests else None
+    # An explicit schema, since a snapshot of an empty table has no files to infer one from
+    schema = pa.schema(
+        [(column.name, _arrow_type(pa, column)) for column in spec.table.columns] + [("month", pa.string())]
+    )
+    dataset = pa.dataset.dataset(path, schema=schema, format="parquet", partitioning="hive")
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+def _projects_with_snapshots(names):
+    for name in names:
+        try:
+            module = load_project_module(name)
+        except FileNotFoundError as e:
+            raise SystemExit(str(e))
+        if not hasattr(module, "SNAPSHOT_TABLES"):
+            raise SystemExit(f"{name} does not declare SNAPSHOT_TABLES")
+        yield name, module
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or restore Parquet snapshots of the trackers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write changed months to Parquet")
+    export.add_argument("projects", nargs="*", default=PROJECTS)
+    export.add_argument("--full", action="store_true", help="Rewrite every month")
+    export.add_argument("--dir", help=f"Snapshot directory (default ${SNAPSHOT_DIR_ENV} or ./snapshots)")
+    restore = commands.add_parser("restore", help="Replace a tracker's tables with their snapshot")
+    restore.add_argument("project")
+    restore.add_argument("--dir")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        for name, module in _projects_with_snapshots(args.projects):
+            for spec in module.SNAPSHOT_TABLES:
+                started = time.perf_counter()
+                manifest = export_table(module.engine, spec, args.dir, args.full)
+                print(f"{name}.{spec.table.name}: {len(manifest['written'])} month(s) written, "
+                      f"{manifest['rows']:,} rows in snapshot ({time.perf_counter() - started:.1f}s)")
+    else:
+        (name, module), = _projects_with_snapshots([args.project])
+        for spec in module.SNAPSHOT_TABLES:
+            started = time.perf_counter()
+            rows = restore_table(module.engine, spec, args.dir)
+            print(f"{name}.{spec.table.name}: {rows:,} rows restored "
+                  f"({time.perf_counter() - started:.1f}s)")
+        with module.engine.begin() as connection:
+            for rebuild in getattr(module, "DERIVED_TABLE_BUILDERS", []):
+                rebuild(connection)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Cold-start profiler for the dashboard projects.
+
+Each project's app.py is imported in a fresh interpreter started with
+``-X importtime`` so that nothing is shared between measurements. The
+report records the import tree, wall time and peak RSS of every project
+and can be diffed against an earlier report to catch regressions.
+
+Usage:
+    python -m common.startup_profiler -o startup_report.json
+    python -m common.startup_profiler --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs inside the child interpreter: import the project without calling main()
+CHILD_SCRIPT = """
+import importlib.util, json, sys, time
+sys.path[:0] = [sys.argv[3], sys.argv[4]]
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location(sys.argv[2], sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        max_rss //= 1024
+except ImportError:
+    max_rss = None
+print(json.dumps({"import_time_s": elapsed, "max_rss_kb": max_rss}))
+"""
+
+def parse_importtime(output):
+    """Turn ``-X importtime`` stderr into a nested list of import nodes"""
+    pending = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            # Header line
+            continue
+        raw = parts[2].rstrip()
+        name = raw.lstrip()
+        level = (len(raw) - len(name) - 1) // 2
+        node = {
+            "module": name,
+            "self_us": self_us,
+            "cumulative_us": cumulative_us,
+            "children": pending.pop(level + 1, [])
+        }
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+def profile_project(project_name, python=sys.executable, timeout=300):
+    """Import one project in a fresh subprocess and measure it"""
+    module_path = ROOT / project_name / "app.py"
+    result = {
+        "wall_time_s": None,
+        "import_time_s": None,
+        "max_rss_kb": None,
+        "returncode": None,
+        "error": None,
+        "top_imports": [],
+        "import_tree": []
+    }
+    # Run from a scratch directory so SQLite-backed projects don't touch real data
+    with tempfile.TemporaryDirectory() as workdir:
+        command = [
+            python, "-X", "importtime", "-c", CHILD_SCRIPT,
+            str(module_path), f"projects.{project_name}",
+            str(module_path.parent), str(ROOT)
+        ]
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(
+                command, cwd=workdir, capture_output=True,
+                text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            result["error"] = f"Timed out after {timeout}s"
+            return result
+        result["wall_time_s"] = time.perf_counter() - start
+
+    result["returncode"] = proc.returncode
+    tree = parse_importtime(proc.stderr)
+    result["import_tree"] = tree
+    result["top_imports"] = [
+        {"module": node["module"], "cumulative_us": node["cumulative_us"]}
+        for node in sorted(tree, key=lambda n: n["cumulative_us"], reverse=True)[:15]
+    ]
+
+    if proc.returncode != 0:
+        errors = [
+            line for line in proc.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        result["error"] = errors[-1] if errors else f"Exited with {proc.returncode}"
+        return result
+
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    result.update(stats)
+    return result
+
+def build_report(categories, projects=None, progress=None):
+    """Profile every project listed in ``categories`` (or the given subset)"""
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "projects": {}
+    }
+    for category, names in categories.items():
+        for name in names:
+            if projects and name not in projects:
+                continue
+            if progress:
+                progress(name)
+            entry = profile_project(name)
+            entry["category"] = category
+            report["projects"][name] = entry
+    return report
+
+def summarize(report):
+    """One row per project, without the import tree"""
+    rows = []
+    for name, entry in report["projects"].items():
+        top = entry["top_imports"][0]["module"] if entry["top_imports"] else None
+        rows.append({
+            "project": name,
+            "category": entry.get("category"),
+            "wall_time_s": entry["wall_time_s"],
+            "import_time_s": entry["import_time_s"],
+            "max_rss_mb": entry["max_rss_kb"] / 1024 if entry["max_rss_kb"] else None,
+            "slowest_import": top,
+            "error": entry["error"]
+        })
+    return rows
+
+def compare_reports(baseline, current):
+    """Per-project deltas between two reports (positive means slower/bigger)"""
+    rows = []
+    for name, entry in current["projects"].items():
+        old = baseline["projects"].get(name)
+        if old is None:
+            continue
+        row = {"project": name}
+        for key in ("wall_time_s", "import_time_s", "max_rss_kb"):
+            before, after = old.get(key), entry.get(key)
+            row[f"{key}_before"] = before
+            row[f"{key}_after"] = after
+            row[f"{key}_change"] = (after - before) / before if before and after is not None else None
+        rows.append(row)
+    return rows
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile project cold-start imports")
+    parser.add_argument("-o", "--output", default="startup_report.json",
+                        help="where to write the JSON report")
+    parser.add_argument("-p", "--project", action="append",
+                        help="only profile this project (repeatable)")
+    parser.add_argument("--compare", help="baseline report to diff against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail if import time grows by more than this fraction")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        if os.path.realpath(args.compare) == os.path.realpath(args.output):
+            parser.error("--compare and --output name the same file; the report would overwrite its baseline")
+        # Read before profiling, so a missing baseline fails fast
+        baseline = load_report(args.compare)
+
+    sys.path.insert(0, str(ROOT))
+    from main import CATEGORIES
+
+    report = build_report(
+        CATEGORIES, args.project,
+        progress=lambda name: print(f"Profiling {name}...", file=sys.stderr)
+    )
+    write_report(report, args.output)
+
+    for row in summarize(report):
+        status = row["error"] or f"{row['import_time_s']:.3f}s import"
+        print(f"{row['project']:<28} {row['wall_time_s'] or 0:7.3f}s wall  {status}")
+    print(f"Report written to {os.path.abspath(args.output)}")
+
+    if baseline is not None:
+        regressions = []
+        for row in compare_reports(baseline, report):
+            change = row["import_time_s_change"]
+            if change is None:
+                continue
+            print(f"{row['project']:<28} import time {change:+.1%}")
+            if change > args.threshold:
+                regressions.append(row["project"])
+        if regressions:
+            print(f"Regressions above {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Shared SQLite engines for the tracker apps.
+
+Every tracker gets one pooled engine per database file for the life of the
+process. Connections are opened in WAL mode so readers are never blocked by
+a writer, with a larger page cache, memory-mapped I/O and a busy timeout so
+concurrent writers wait instead of failing with "database is locked".
+"""
+import contextlib
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+
+# Directory holding the tracker databases; defaults to the working directory
+DB_DIR_ENV = "TRACKER_DB_DIR"
+
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_engines = {}
+_lock = threading.Lock()
+
+def database_path(filename):
+    """Absolute path of a tracker database, honouring TRACKER_DB_DIR"""
+    return os.path.abspath(os.path.join(os.environ.get(DB_DIR_ENV, ""), filename))
+
+def _configure_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def get_engine(filename):
+    """The process-wide engine for ``filename``, created on first use"""
+    path = database_path(filename)
+    with _lock:
+        engine = _engines.get(path)
+        if engine is None:
+            engine = create_engine(
+                f"sqlite:///{path}",
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                connect_args={
+                    "timeout": BUSY_TIMEOUT_MS / 1000,
+                    "check_same_thread": False
+                }
+            )
+            event.listen(engine, "connect", _configure_connection)
+            _engines[path] = engine
+        return engine
+
+@contextlib.contextmanager
+def session_scope(session_factory):
+    """One session and one transaction for a block of work; rolls back on error"""
+    session = session_factory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,48 @@
+"""Vectorized valuation of portfolio positions.
+
+Positions are passed as aligned vectors (tickers, shares, cost basis, last
+prices), so market values, unrealized P&L and weights for the whole
+portfolio come out of one pass of array arithmetic.
+"""
+import numpy as np
+import pandas as pd
+
+VALUATION_COLUMNS = ["ticker", "shares", "price", "market_value", "cost_basis",
+                     "pnl", "pnl_pct", "weight"]
+
+def value_positions(tickers, shares, cost_basis, prices):
+    """One row per position; positions without a price get NaN values"""
+    shares = np.asarray(shares, dtype=np.float64)
+    cost_basis = np.asarray(cost_basis, dtype=np.float64)
+    # None prices become NaN
+    prices = np.array(prices, dtype=np.float64).reshape(shares.shape)
+
+    market_value = shares * prices
+    pnl = market_value - cost_basis
+    total = np.nansum(market_value)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(cost_basis > 0, pnl / cost_basis * 100, np.nan)
+        weight = market_value / total * 100 if total else np.full_like(market_value, np.nan)
+
+    return pd.DataFrame({
+        "ticker": list(tickers),
+        "shares": shares,
+        "price": prices,
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "pnl": pnl,
+        "pnl_pct": pnl_pct,
+        "weight": weight
+    }, columns=VALUATION_COLUMNS)
+
+def totals(positions):
+    """Portfolio-wide market value, cost basis and P&L over the priced positions"""
+    priced = positions["price"].notna().to_numpy()
+    market_value = positions["market_value"].to_numpy()[priced].sum()
+    cost_basis = positions["cost_basis"].to_numpy()[priced].sum()
+    return {
+        "market_value": float(market_value),
+        "cost_basis": float(cost_basis),
+        "pnl": float(market_value - cost_basis),
+        "unpriced": int((~priced).sum())
+    }
@@ -1,13 +1,27 @@
 import streamlit as st
-import requests
-import pandas as pd
-import plotly.graph_objs as go
-from pycoingecko import CoinGeckoAPI
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common.lazy_imports import lazy_import
 import time
 
+# Heavy dependencies are only imported when first used
+requests = lazy_import("requests")
+pd = lazy_import("pandas")
+go = lazy_import("plotly.graph_objs")
+downsampling = lazy_import("common.downsampling")
+pycoingecko = lazy_import("pycoingecko")
+
+# Price history ranges offered, as CoinGecko ``days`` values
+HISTORY_RANGES = {"7 days": 7, "30 days": 30, "90 days": 90, "1 year": 365, "Max": "max"}
+
 class CryptoTracker:
     def __init__(self):
-        self.cg = CoinGeckoAPI()
+        self.cg = pycoingecko.CoinGeckoAPI()
     
     def get_top_cryptocurrencies(self, limit=10):
         """Fetch top cryptocurrencies by market cap"""
@@ -43,6 +57,8 @@ class CryptoTracker:
             columns=['Date', 'Price']
         )
         df['Date'] = pd.to_datetime(df['Date'], unit='ms')
+        days = (df['Date'].iloc[-1] - df['Date'].iloc[0]).days
+        df = downsampling.lttb(df, 'Date', 'Price')
         
         fig = go.Figure(data=[go.Scatter(
             x=df['Date'], 
@@ -52,7 +68,7 @@ class CryptoTracker:
         )])
         
         fig.update_layout(
-            title=f'{coin_name} Price Over Last {len(df)} Days',
+            title=f'{coin_name} Price Over Last {days} Days',
             xaxis_title='Date',
             yaxis_title='Price (USD)'
         )
@@ -101,10 +117,13 @@ def main():
     ])
     
     with tab1:
+        # Shorter ranges come back from CoinGecko at a finer granularity
+        history_range = st.selectbox("Range", list(HISTORY_RANGES), index=1, key="history_range")
+        
         # Historical price chart
         historical_data = tracker.get_historical_price_data(
             selected_crypto['id'], 
-            days=30
+            days=HISTORY_RANGES[history_range]
         )
         
         if historical_data:
@@ -1,16 +1,30 @@
 import streamlit as st
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common import bulk_import, columnar, query_cache, snapshots
+from common.lazy_imports import lazy_import
+from common.migrations import Migration, apply_migrations
+from common.storage import get_engine, session_scope
 import sqlalchemy as sa
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objs as go
 from datetime import datetime, timedelta
 
+# Heavy dependencies are only imported when first used
+pd = lazy_import("pandas")
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objs")
+downsampling = lazy_import("common.downsampling")
+
 # Database Setup
 Base = declarative_base()
-engine = sa.create_engine('sqlite:///expense_tracker.db')
-Session = sessionmaker(bind=engine)
+engine = get_engine('expense_tracker.db')
+Session = sessionmaker(bind=engine, expire_on_commit=False)
 
 class Expense(Base):
     __tablename__ = 'expenses'
@@ -22,40 +36,132 @@ class Expense(Base):
 
 Base.metadata.create_all(engine)
 
+# Schema changes applied on top of create_all, oldest first
+MIGRATIONS = [
+    Migration(1, "Index expenses by date, category and amount", [
+        "CREATE INDEX IF NOT EXISTS ix_expenses_date_category_amount ON expenses (date, category, amount)"
+    ]),
+    Migration(2, "Log changed months for Parquet snapshots",
+              snapshots.change_tracking_steps("expenses", "date")),
+]
+apply_migrations(engine, MIGRATIONS)
+
+CATEGORIES = [
+    "Food", "Transport", "Housing", "Utilities", 
+    "Entertainment", "Shopping", "Healthcare", "Other"
+]
+# Expense exports list spending as positive amounts; refunds come in negative and are rejected
+IMPORT_TARGET = bulk_import.ImportTarget("expenses", CATEGORIES, "Other", signs="debits-positive")
+SNAPSHOT_TABLES = [snapshots.SnapshotTable(Expense.__table__, "date")]
+
+# Columns returned by get_expenses and how they are typed
+EXPENSE_COLUMNS = [
+    ('Date', columnar.DATE),
+    ('Category', columnar.CATEGORY),
+    ('Amount', columnar.FLOAT),
+    ('Description', columnar.TEXT)
+]
+
 class ExpenseTracker:
     @staticmethod
     def add_expense(date, category, amount, description):
-        session = Session()
-        expense = Expense(
-            date=date, 
-            category=category, 
-            amount=amount, 
-            description=description
-        )
-        session.add(expense)
-        session.commit()
-        session.close()
+        with session_scope(Session) as session:
+            session.add(Expense(
+                date=date, 
+                category=category, 
+                amount=amount, 
+                description=description
+            ))
+        query_cache.invalidate(engine, "expenses")
 
     @staticmethod
+    @query_cache.cached(engine, "expenses")
     def get_expenses(start_date=None, end_date=None):
-        session = Session()
-        query = session.query(Expense)
-        
+        """Expenses in the date range as a typed, columnar DataFrame"""
+        sql = "SELECT date, category, amount, description FROM expenses"
+        params = ()
         if start_date and end_date:
-            query = query.filter(
-                Expense.date.between(start_date, end_date)
-            )
-        
-        expenses = query.all()
-        session.close()
-        
-        return pd.DataFrame([
+            sql += " WHERE date BETWEEN ? AND ?"
+            params = (start_date.isoformat(), end_date.isoformat())
+        return columnar.read_frame(engine, sql, params, EXPENSE_COLUMNS)
+
+    @staticmethod
+    def _in_range(query, start_date, end_date):
+        if start_date and end_date:
+            query = query.filter(Expense.date.between(start_date, end_date))
+        return query
+
+    @staticmethod
+    @query_cache.cached(engine, "expenses")
+    def get_total(start_date=None, end_date=None):
+        """Total spent in the date range"""
+        with session_scope(Session) as session:
+            query = session.query(sa.func.coalesce(sa.func.sum(Expense.amount), 0.0))
+            return ExpenseTracker._in_range(query, start_date, end_date).scalar()
+
+    @staticmethod
+    @query_cache.cached(engine, "expenses")
+    def get_category_totals(start_date=None, end_date=None):
+        """Amount spent per category, aggregated in SQL"""
+        with session_scope(Session) as session:
+            query = session.query(
+                Expense.category, sa.func.sum(Expense.amount)
+            ).group_by(Expense.category)
+            rows = ExpenseTracker._in_range(query, start_date, end_date).all()
+        return pd.DataFrame(rows, columns=['Category', 'Amount'])
+
+    @staticmethod
+    @query_cache.cached(engine, "expenses")
+    def get_daily_totals(start_date=None, end_date=None):
+        """Amount spent per day, aggregated in SQL"""
+        with session_scope(Session) as session:
+            query = session.query(
+                Expense.date, sa.func.sum(Expense.amount)
+            ).group_by(Expense.date).order_by(Expense.date)
+            rows = ExpenseTracker._in_range(query, start_date, end_date).all()
+        daily_totals = pd.DataFrame(rows, columns=['Date', 'Amount'])
+        # Datetimes, as the snapshot path returns, so the chart can be downsampled
+        daily_totals['Date'] = pd.to_datetime(daily_totals['Date'])
+        return daily_totals
+
+    @staticmethod
+    @query_cache.cached(engine, "expenses", "snapshot_changes")
+    def get_snapshot_totals(start_date=None, end_date=None):
+        """Category and daily totals read from the Parquet snapshot; None if missing or stale"""
+        expenses = snapshots.read_snapshot(
+            engine, SNAPSHOT_TABLES[0], start_date, end_date, ['date', 'category', 'amount']
+        )
+        if expenses is None:
+            return None
+        expenses['date'] = pd.to_datetime(expenses['date'])
+        category_totals = expenses.groupby('category', as_index=False)['amount'].sum()
+        daily_totals = expenses.groupby('date', as_index=False)['amount'].sum()
+        return (
+            category_totals.set_axis(['Category', 'Amount'], axis=1),
+            daily_totals.set_axis(['Date', 'Amount'], axis=1)
+        )
+
+    @staticmethod
+    @query_cache.cached(engine, "expenses")
+    def get_spent_by_category(categories, start_date=None, end_date=None):
+        """Amount spent in each of ``categories`` (a tuple) in the date range"""
+        with session_scope(Session) as session:
+            query = session.query(
+                Expense.category, sa.func.sum(Expense.amount)
+            ).filter(Expense.category.in_(categories)).group_by(Expense.category)
+            return dict(ExpenseTracker._in_range(query, start_date, end_date).all())
+
+    @staticmethod
+    def get_budget_consumption(budgets, start_date=None, end_date=None):
+        """Spent and remaining amount for each budgeted category"""
+        spent = ExpenseTracker.get_spent_by_category(tuple(budgets), start_date, end_date)
+        return [
             {
-                'Date': e.date, 
-                'Category': e.category, 
-                'Amount': e.amount, 
-                'Description': e.description
-            } for e in expenses])
+                'Category': category,
+                'Budget': budget,
+                'Spent': spent.get(category, 0.0),
+                'Remaining': budget - spent.get(category, 0.0)
+            } for category, budget in budgets.items()]
 
 def main():
     st.title("💰 Expense Tracker")
@@ -63,17 +169,37 @@ def main():
     # Sidebar for adding expenses
     st.sidebar.header("Add New Expense")
     expense_date = st.sidebar.date_input("Date", datetime.today())
-    categories = [
-        "Food", "Transport", "Housing", "Utilities", 
-        "Entertainment", "Shopping", "Healthcare", "Other"
-    ]
-    category = st.sidebar.selectbox("Category", categories)
+    category = st.sidebar.selectbox("Category", CATEGORIES)
     amount = st.sidebar.number_input("Amount ($)", min_value=0.0, step=0.01)
     description = st.sidebar.text_input("Description")
     
     if st.sidebar.button("Add Expense"):
         ExpenseTracker.add_expense(expense_date, category, amount, description)
         st.sidebar.success("Expense added successfully!")
+
+    # Bulk import from a bank export
+    with st.sidebar.expander("Bulk Import"):
+        uploaded_file = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"])
+        conventions = list(bulk_import.SIGN_CONVENTIONS)
+        signs = st.selectbox(
+            "Amount signs", conventions, index=conventions.index(IMPORT_TARGET.signs),
+            format_func=bulk_import.SIGN_CONVENTIONS.get
+        )
+        if uploaded_file is not None and st.button("Import File"):
+            progress_bar = st.progress(0.0)
+            try:
+                status = bulk_import.import_file(
+                    engine, IMPORT_TARGET, uploaded_file, signs=signs,
+                    progress=lambda s: progress_bar.progress(
+                        s.fraction, text=f"{s.rows_imported:,} rows imported"
+                    )
+                )
+                st.success(
+                    f"Imported {status.rows_imported:,} rows "
+                    f"({status.rows_rejected:,} rejected) in {status.elapsed_s:.1f}s"
+                )
+            except (ValueError, ImportError) as e:
+                st.error(f"Import failed: {e}")
     
     # Main area with tabs
     tab1, tab2, tab3 = st.tabs(["Expense List", "Spending Analysis", "Budget Tracking"])
@@ -94,40 +220,47 @@ def main():
         expenses_df.columns = [col.strip().title() for col in expenses_df.columns]
         
         if not expenses_df.empty:
-            st.dataframe(expenses_df)
+            st.dataframe(expenses_df, column_config={"Date": st.column_config.DateColumn()})
             
             # Total expenses
-            total_expenses = expenses_df['Amount'].sum()
+            total_expenses = ExpenseTracker.get_total(start_date, end_date)
             st.metric("Total Expenses", f"${total_expenses:.2f}")
     
     with tab2:
         st.header("Spending Analysis")
         
-        if not expenses_df.empty:
-            if 'Category' not in expenses_df.columns:
-                st.error("No 'Category' column found in your data. Please check your CSV or data source.")
-                st.write("Available columns:", expenses_df.columns.tolist())
-            else:
-                # Category-wise spending
-                category_spending = expenses_df.groupby('Category')['Amount'].sum().reset_index()
-                # Pie chart of spending by category
-                fig1 = px.pie(
-                    category_spending, 
-                    values='Amount', 
-                    names='Category', 
-                    title='Spending by Category'
-                )
-                st.plotly_chart(fig1)
-                # Line chart of expenses over time
-                expenses_df['Date'] = pd.to_datetime(expenses_df['Date'])
-                daily_expenses = expenses_df.groupby(expenses_df['Date'].dt.date)['Amount'].sum().reset_index()
-                fig2 = go.Figure(data=go.Scatter(
-                    x=daily_expenses['Date'], 
-                    y=daily_expenses['Amount'], 
-                    mode='lines+markers'
-                ))
-                fig2.update_layout(title='Daily Expenses', xaxis_title='Date', yaxis_title='Amount')
-                st.plotly_chart(fig2)
+        # Long historical ranges can be scanned from the Parquet snapshot instead of SQLite
+        snapshot_totals = None
+        if st.toggle("Read from Parquet snapshot", key="use_snapshot"):
+            snapshot_totals = ExpenseTracker.get_snapshot_totals(start_date, end_date)
+            if snapshot_totals is None:
+                st.info("No up-to-date snapshot covers this range; reading the live database.")
+        
+        # Category-wise spending
+        if snapshot_totals is not None:
+            category_spending, daily_totals = snapshot_totals
+        else:
+            category_spending = ExpenseTracker.get_category_totals(start_date, end_date)
+        if not category_spending.empty:
+            # Pie chart of spending by category
+            fig1 = px.pie(
+                category_spending, 
+                values='Amount', 
+                names='Category', 
+                title='Spending by Category'
+            )
+            st.plotly_chart(fig1)
+            # Line chart of expenses over time
+            if snapshot_totals is None:
+                daily_totals = ExpenseTracker.get_daily_totals(start_date, end_date)
+            daily_expenses = downsampling.lttb(daily_totals, 'Date', 'Amount')
+            fig2 = go.Figure(data=go.Scatter(
+                x=daily_expenses['Date'], 
+                y=daily_expenses['Amount'], 
+                mode='lines+markers'
+            ))
+            fig2.update_layout(title='Daily Expenses', xaxis_title='Date', yaxis_title='Amount')
+            st.plotly_chart(fig2)
     
     with tab3:
         st.header("Budget Tracking")
@@ -144,24 +277,20 @@ def main():
             "Other": 150
         }
         
-        if 'Category' not in expenses_df.columns:
-            st.error("No 'Category' column found in your data. Budget tracking cannot proceed.")
-            st.write("Available columns:", expenses_df.columns.tolist())
-        else:
-            for category, budget in budget_categories.items():
-                category_total = expenses_df[expenses_df['Category'] == category]['Amount'].sum()
-                remaining = budget - category_total
-                st.subheader(f"{category} Budget")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Budget", f"${budget}")
-                with col2:
-                    st.metric("Spent", f"${category_total:.2f}")
-                with col3:
-                    st.metric("Remaining", f"${remaining:.2f}", 
-                              delta=f"{(category_total/budget)*100:.1f}%" if budget > 0 else "N/A")
-                # Progress bar
-                st.progress(min(category_total/budget, 1.0))
+        for row in ExpenseTracker.get_budget_consumption(budget_categories, start_date, end_date):
+            category, budget = row['Category'], row['Budget']
+            category_total, remaining = row['Spent'], row['Remaining']
+            st.subheader(f"{category} Budget")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Budget", f"${budget}")
+            with col2:
+                st.metric("Spent", f"${category_total:.2f}")
+            with col3:
+                st.metric("Remaining", f"${remaining:.2f}", 
+                          delta=f"{(category_total/budget)*100:.1f}%" if budget > 0 else "N/A")
+            # Progress bar
+            st.progress(min(category_total/budget, 1.0))
 
 if __name__ == "__main__":
     main()
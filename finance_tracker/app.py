@@ -1,16 +1,29 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objs as go
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common import bulk_import, columnar, query_cache, snapshots
+from common.lazy_imports import lazy_import
+from common.migrations import Migration, apply_migrations
+from common.storage import get_engine, session_scope
+from sqlalchemy import Column, Integer, String, Float, Date, case, func, text, tuple_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
 
+# Heavy dependencies are only imported when first used
+pd = lazy_import("pandas")
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objs")
+
 # SQLAlchemy Setup
 Base = declarative_base()
-engine = create_engine('sqlite:///finance_tracker.db')
-Session = sessionmaker(bind=engine)
+engine = get_engine('finance_tracker.db')
+Session = sessionmaker(bind=engine, expire_on_commit=False)
 
 class Transaction(Base):
     __tablename__ = 'transactions'
@@ -20,70 +33,330 @@ class Transaction(Base):
     amount = Column(Float)
     description = Column(String)
 
+class MonthlyRollup(Base):
+    """Per-month, per-category totals kept in step with ``transactions``"""
+    __tablename__ = 'monthly_rollup'
+    month = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
 Base.metadata.create_all(engine)
 
-def add_transaction(date, category, amount, description):
-    session = Session()
-    transaction = Transaction(
-        date=date, 
-        category=category, 
-        amount=amount, 
-        description=description
+ROLLUP_UPSERT = text(
+    "INSERT INTO monthly_rollup (month, category, total, count) "
+    "VALUES (:month, :category, :total, :count) "
+    "ON CONFLICT (month, category) DO UPDATE SET "
+    "total = total + excluded.total, count = count + excluded.count"
+)
+
+ROLLUP_QUERY = (
+    "SELECT strftime('%Y-%m', date) AS month, category, SUM(amount), COUNT(*) "
+    "FROM transactions WHERE date IS NOT NULL AND category IS NOT NULL "
+    "GROUP BY month, category"
+)
+
+def update_monthly_rollup(connection, deltas):
+    """Add (month, category, total, count) deltas to the rollup in the caller's transaction"""
+    if not deltas:
+        return
+    connection.execute(ROLLUP_UPSERT, [
+        {'month': month, 'category': category, 'total': total, 'count': count}
+        for month, category, total, count in deltas
+    ])
+    connection.execute(text("DELETE FROM monthly_rollup WHERE count <= 0"))
+
+def rebuild_monthly_rollup(connection):
+    """Recompute the whole rollup from ``transactions``"""
+    connection.exec_driver_sql("DELETE FROM monthly_rollup")
+    connection.exec_driver_sql(
+        f"INSERT INTO monthly_rollup (month, category, total, count) {ROLLUP_QUERY}"
     )
-    session.add(transaction)
-    session.commit()
-    session.close()
-
-def get_transactions():
-    session = Session()
-    transactions = session.query(Transaction).all()
-    session.close()
-    return pd.DataFrame([
-        {
-            'Date': t.date, 
-            'Category': t.category, 
-            'Amount': t.amount, 
-            'Description': t.description
-        } for t in transactions
+
+def check_monthly_rollup(connection, tolerance=0.005):
+    """Rows where the rollup disagrees with ``transactions``; empty when consistent"""
+    expected = {
+        (month, category): (total, count)
+        for month, category, total, count in connection.exec_driver_sql(ROLLUP_QUERY)
+    }
+    actual = {
+        (month, category): (total, count)
+        for month, category, total, count in connection.exec_driver_sql(
+            "SELECT month, category, total, count FROM monthly_rollup"
+        )
+    }
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_total, expected_count = expected.get(key, (0.0, 0))
+        actual_total, actual_count = actual.get(key, (0.0, 0))
+        if expected_count != actual_count or abs(expected_total - actual_total) > tolerance:
+            mismatches.append({
+                'month': key[0],
+                'category': key[1],
+                'expected_total': expected_total,
+                'actual_total': actual_total,
+                'expected_count': expected_count,
+                'actual_count': actual_count
+            })
+    return mismatches
+
+def _rollup_imported_rows(connection, rows):
+    """Bulk import hook: fold each imported chunk into the rollup"""
+    grouped = rows.groupby([rows['date'].str[:7], 'category'])['amount'].agg(['sum', 'count'])
+    update_monthly_rollup(connection, [
+        (month, category, float(total), int(count))
+        for (month, category), (total, count) in grouped.iterrows()
     ])
 
+# Schema changes applied on top of create_all, oldest first
+MIGRATIONS = [
+    Migration(1, "Index transactions by date, category and amount", [
+        "CREATE INDEX IF NOT EXISTS ix_transactions_date_category_amount ON transactions (date, category, amount)"
+    ]),
+    Migration(2, "Index transactions for keyset pagination on (date, id)", [
+        "CREATE INDEX IF NOT EXISTS ix_transactions_date_id ON transactions (date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_category_date_id ON transactions (category, date, id)"
+    ]),
+    Migration(3, "Backfill monthly_rollup from existing transactions", [
+        rebuild_monthly_rollup
+    ]),
+    Migration(4, "Log changed months for Parquet snapshots",
+              snapshots.change_tracking_steps("transactions", "date")),
+]
+apply_migrations(engine, MIGRATIONS)
+
+CATEGORIES = ["Income", "Food", "Transport", "Entertainment", "Bills", "Shopping", "Other"]
+# Bank statements show money in as positive; uncategorized credits are filed as Income
+IMPORT_TARGET = bulk_import.ImportTarget(
+    "transactions", CATEGORIES, "Other", after_insert=_rollup_imported_rows,
+    income_category="Income", signs="credits-positive"
+)
+
+# Tables derived from transactions, rebuilt after out-of-band writes such as benchmark seeding
+DERIVED_TABLE_BUILDERS = [rebuild_monthly_rollup]
+
+SNAPSHOT_TABLES = [snapshots.SnapshotTable(Transaction.__table__, "date")]
+
+# Columns of a transaction page and how they are typed
+TRANSACTION_COLUMNS = [
+    ('Id', columnar.INT),
+    ('Date', columnar.DATE),
+    ('Category', columnar.CATEGORY),
+    ('Amount', columnar.FLOAT),
+    ('Description', columnar.TEXT)
+]
+
+# Rows shown per page of the transaction history
+PAGE_SIZE = 50
+
+def add_transaction(date, category, amount, description):
+    with session_scope(Session) as session:
+        session.add(Transaction(
+            date=date, 
+            category=category, 
+            amount=amount, 
+            description=description
+        ))
+        update_monthly_rollup(session.connection(), [
+            (date.strftime('%Y-%m'), category, amount, 1)
+        ])
+    query_cache.invalidate(engine, "transactions", "monthly_rollup")
+
+def delete_transaction(transaction_id):
+    """Delete a transaction and take it out of the monthly rollup"""
+    with session_scope(Session) as session:
+        transaction = session.get(Transaction, transaction_id)
+        if transaction is None:
+            return False
+        session.delete(transaction)
+        session.flush()
+        if transaction.date is not None and transaction.category is not None:
+            update_monthly_rollup(session.connection(), [
+                (transaction.date.strftime('%Y-%m'), transaction.category, -transaction.amount, -1)
+            ])
+    query_cache.invalidate(engine, "transactions", "monthly_rollup")
+    return True
+
+def _signed_amount():
+    """Income counts towards the balance, every other category against it"""
+    return case((Transaction.category == 'Income', Transaction.amount), else_=-Transaction.amount)
+
+@query_cache.cached(engine, "transactions")
+def get_transaction_page(after=None, page_size=PAGE_SIZE, category=None, start_date=None, end_date=None):
+    """One page of transactions, newest first, keyset-paginated on (date, id)
+
+    ``after`` is the (date, id) key of the last row of the previous page.
+    Returns the page as a typed, columnar DataFrame and the key of the next
+    page, or None when this is the last one.
+    """
+    conditions, params = [], []
+    if category:
+        conditions.append("category = ?")
+        params.append(category)
+    if start_date:
+        conditions.append("date >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        conditions.append("date <= ?")
+        params.append(end_date.isoformat())
+    if after is not None:
+        conditions.append("(date, id) < (?, ?)")
+        params.extend([after[0].isoformat(), after[1]])
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    rows = columnar.read_frame(
+        engine,
+        "SELECT id, date, category, amount, description FROM transactions "
+        f"{where}ORDER BY date DESC, id DESC LIMIT ?",
+        params + [page_size + 1], TRANSACTION_COLUMNS
+    )
+
+    next_key = None
+    if len(rows) > page_size:
+        last = rows.iloc[page_size - 1]
+        next_key = (last['Date'].date(), int(last['Id']))
+    return rows.iloc[:page_size].copy(), next_key
+
+@query_cache.cached(engine, "transactions")
+def get_balance(through=None):
+    """Income minus spending, optionally only up to and including a (date, id) key"""
+    with session_scope(Session) as session:
+        query = session.query(func.coalesce(func.sum(_signed_amount()), 0.0))
+        if through is not None:
+            query = query.filter(tuple_(Transaction.date, Transaction.id) <= tuple(through))
+        return query.scalar()
+
+@query_cache.cached(engine, "monthly_rollup")
+def get_category_totals(include_income=False):
+    """Amount per category, summed from the monthly rollup"""
+    with session_scope(Session) as session:
+        query = session.query(MonthlyRollup.category, func.sum(MonthlyRollup.total))
+        if not include_income:
+            query = query.filter(MonthlyRollup.category != 'Income')
+        rows = query.group_by(MonthlyRollup.category).all()
+    return pd.DataFrame(rows, columns=['Category', 'Amount'])
+
+@query_cache.cached(engine, "monthly_rollup")
+def get_monthly_totals():
+    """Amount per month and category, read from the monthly rollup"""
+    with session_scope(Session) as session:
+        rows = session.query(
+            MonthlyRollup.month, MonthlyRollup.category, MonthlyRollup.total
+        ).order_by(MonthlyRollup.month).all()
+    return pd.DataFrame(rows, columns=['Month', 'Category', 'Amount'])
+
+@query_cache.cached(engine, "transactions", "snapshot_changes")
+def get_snapshot_monthly_totals():
+    """Monthly totals as get_monthly_totals, read from the Parquet snapshot; None if missing or stale"""
+    transactions = snapshots.read_snapshot(engine, SNAPSHOT_TABLES[0], columns=['date', 'category', 'amount'])
+    if transactions is None:
+        return None
+    # The rollup leaves out rows without a date or category
+    transactions = transactions.dropna(subset=['date', 'category'])
+    transactions['month'] = pd.to_datetime(transactions['date']).dt.strftime('%Y-%m')
+    totals = transactions.groupby(['month', 'category'], as_index=False)['amount'].sum()
+    return totals.set_axis(['Month', 'Category', 'Amount'], axis=1)
+
+def with_running_balance(page):
+    """Add the account balance after each row of a newest-first, unfiltered page"""
+    if page.empty:
+        return page
+    top = get_balance(through=(page['Date'].iloc[0].date(), int(page['Id'].iloc[0])))
+    signed = page['Amount'].where(page['Category'] == 'Income', -page['Amount'])
+    page['Balance'] = top - signed.cumsum() + signed
+    return page
+
+def _next_page(key):
+    st.session_state.txn_cursors.append(key)
+
+def _previous_page():
+    st.session_state.txn_cursors.pop()
+
 def main():
     st.title("💰 Personal Finance Tracker")
     
     # Sidebar for adding transactions
     st.sidebar.header("Add New Transaction")
     transaction_date = st.sidebar.date_input("Date", datetime.date.today())
-    categories = ["Income", "Food", "Transport", "Entertainment", "Bills", "Shopping", "Other"]
-    category = st.sidebar.selectbox("Category", categories)
+    category = st.sidebar.selectbox("Category", CATEGORIES)
     amount = st.sidebar.number_input("Amount ($)", min_value=0.0, step=0.01)
     description = st.sidebar.text_input("Description")
     
     if st.sidebar.button("Add Transaction"):
         add_transaction(transaction_date, category, amount, description)
         st.sidebar.success("Transaction added successfully!")
+
+    # Bulk import from a bank export
+    with st.sidebar.expander("Bulk Import"):
+        uploaded_file = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"])
+        conventions = list(bulk_import.SIGN_CONVENTIONS)
+        signs = st.selectbox(
+            "Amount signs", conventions, index=conventions.index(IMPORT_TARGET.signs),
+            format_func=bulk_import.SIGN_CONVENTIONS.get
+        )
+        if uploaded_file is not None and st.button("Import File"):
+            progress_bar = st.progress(0.0)
+            try:
+                status = bulk_import.import_file(
+                    engine, IMPORT_TARGET, uploaded_file, signs=signs,
+                    progress=lambda s: progress_bar.progress(
+                        s.fraction, text=f"{s.rows_imported:,} rows imported"
+                    )
+                )
+                st.success(
+                    f"Imported {status.rows_imported:,} rows "
+                    f"({status.rows_rejected:,} rejected) in {status.elapsed_s:.1f}s"
+                )
+            except (ValueError, ImportError) as e:
+                st.error(f"Import failed: {e}")
     
     # Main area for displaying transactions and insights
     tab1, tab2, tab3 = st.tabs(["Transactions", "Spending Analysis", "Monthly Overview"])
     
     with tab1:
         st.header("Transaction History")
-        df = get_transactions()
-        if not df.empty:
-            st.dataframe(df)
+        
+        # Server-side filters
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            category_filter = st.selectbox("Show", ["All"] + CATEGORIES, key="txn_category")
+        with col2:
+            start_filter = st.date_input("From", value=None, key="txn_start")
+        with col3:
+            end_filter = st.date_input("To", value=None, key="txn_end")
+        category_filter = None if category_filter == "All" else category_filter
+        
+        # Go back to the first page whenever the filters change
+        filters = (category_filter, start_filter, end_filter)
+        if st.session_state.get('txn_filters') != filters:
+            st.session_state.txn_filters = filters
+            st.session_state.txn_cursors = [None]
+        cursors = st.session_state.txn_cursors
+        
+        page, next_key = get_transaction_page(cursors[-1], PAGE_SIZE, *filters)
+        if not page.empty:
+            # The running balance covers every category, so only show it unfiltered
+            if category_filter is None:
+                page = with_running_balance(page)
+            st.dataframe(page.drop(columns='Id'), hide_index=True,
+                         column_config={"Date": st.column_config.DateColumn()})
+            
+            col1, col2, col3 = st.columns([1, 1, 3])
+            with col1:
+                st.button("Previous", on_click=_previous_page, disabled=len(cursors) == 1)
+            with col2:
+                st.button("Next", on_click=_next_page, args=(next_key,), disabled=next_key is None)
+            with col3:
+                st.caption(f"Page {len(cursors)}")
             
             # Total balance calculation
-            total_income = df[df['Category'] == 'Income']['Amount'].sum()
-            total_expenses = df[df['Category'] != 'Income']['Amount'].sum()
-            st.metric("Total Balance", f"${total_income - total_expenses:.2f}")
+            st.metric("Total Balance", f"${get_balance():.2f}")
         else:
             st.write("No transactions yet.")
     
     with tab2:
         st.header("Spending by Category")
-        if not df.empty:
-            expense_df = df[df['Category'] != 'Income']
-            category_spending = expense_df.groupby('Category')['Amount'].sum().reset_index()
-            
+        category_spending = get_category_totals()
+        if not category_spending.empty:
             # Pie chart of spending
             fig = px.pie(
                 category_spending, 
@@ -95,9 +368,17 @@ def main():
     
     with tab3:
         st.header("Monthly Spending Trend")
-        if not df.empty:
-            df['Month'] = pd.to_datetime(df['Date']).dt.to_period('M')
-            monthly_spending = df.groupby(['Month', 'Category'])['Amount'].sum().unstack()
+        
+        # Long histories can be scanned from the Parquet snapshot instead of SQLite
+        monthly_totals = None
+        if st.toggle("Read from Parquet snapshot", key="use_snapshot"):
+            monthly_totals = get_snapshot_monthly_totals()
+            if monthly_totals is None:
+                st.info("No up-to-date snapshot of the transactions; reading the live database.")
+        if monthly_totals is None:
+            monthly_totals = get_monthly_totals()
+        if not monthly_totals.empty:
+            monthly_spending = monthly_totals.pivot(index='Month', columns='Category', values='Amount')
             
             # Line chart of monthly trends
             fig = go.Figure()
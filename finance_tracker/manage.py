@@ -0,0 +1,39 @@
+"""Maintenance commands for the finance tracker database.
+
+Usage:
+    python finance_tracker/manage.py rebuild-rollup
+    python finance_tracker/manage.py check-rollup
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common.projects import load_project_module
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Finance tracker maintenance")
+    parser.add_argument("command", choices=["rebuild-rollup", "check-rollup"])
+    args = parser.parse_args(argv)
+
+    app = load_project_module("finance_tracker")
+    if args.command == "rebuild-rollup":
+        with app.engine.begin() as connection:
+            app.rebuild_monthly_rollup(connection)
+            rows = connection.exec_driver_sql("SELECT COUNT(*) FROM monthly_rollup").scalar()
+        print(f"Rebuilt monthly_rollup ({rows} rows)")
+        return 0
+
+    with app.engine.connect() as connection:
+        mismatches = app.check_monthly_rollup(connection)
+    for row in mismatches:
+        print(f"{row['month']} {row['category']}: expected {row['expected_total']:.2f} "
+              f"({row['expected_count']}), found {row['actual_total']:.2f} ({row['actual_count']})")
+    print("monthly_rollup is consistent" if not mismatches else f"{len(mismatches)} mismatched rows")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
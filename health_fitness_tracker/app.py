@@ -1,16 +1,31 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objs as go
-from sqlalchemy import create_engine, Column, Integer, Float, String, Date
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common import columnar, query_cache, snapshots
+from common.lazy_imports import lazy_import
+from common.migrations import Migration, apply_migrations
+from common.storage import get_engine, session_scope
+from sqlalchemy import Column, Integer, Float, String, Date
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
+import threading
+
+# Heavy dependencies are only imported when first used
+pd = lazy_import("pandas")
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objs")
+downsampling = lazy_import("common.downsampling")
 
 # SQLAlchemy setup
 Base = declarative_base()
-engine = create_engine('sqlite:///health_tracker.db')
-Session = sessionmaker(bind=engine)
+engine = get_engine('health_tracker.db')
+Session = sessionmaker(bind=engine, expire_on_commit=False)
 
 class HealthEntry(Base):
     """SQLAlchemy model for health tracking"""
@@ -24,52 +39,294 @@ class HealthEntry(Base):
     workout_type = Column(String)
     workout_duration = Column(Integer)
 
+class DailyMetric(Base):
+    """Rolling metrics per calendar day, maintained from health_entries"""
+    __tablename__ = 'daily_metrics'
+    
+    date = Column(Date, primary_key=True)
+    weight = Column(Float)
+    weight_7d = Column(Float)
+    weight_30d = Column(Float)
+    weight_trend = Column(Float)
+    steps = Column(Float)
+    steps_7d = Column(Float)
+    steps_30d = Column(Float)
+    weekly_steps = Column(Float)
+    calories = Column(Float)
+    calories_7d = Column(Float)
+    calorie_balance_7d = Column(Float)
+    workout_minutes = Column(Float)
+    workout_streak = Column(Integer)
+
 # Create tables
 Base.metadata.create_all(engine)
 
-class HealthFitnessTracker:
-    def __init__(self):
-        self.session = Session()
+# Longest rolling window; a refresh reloads this much history before its start date
+METRICS_HISTORY_DAYS = 30
+WEIGHT_TREND_SPAN = 10
+CALORIE_TARGET = 2000
+
+METRIC_COLUMNS = [column.name for column in DailyMetric.__table__.columns]
+
+def daily_totals(connection, start_date):
+    """Per-day weight mean and calorie, step and workout sums from ``start_date`` on"""
+    rows = connection.exec_driver_sql(
+        "SELECT date, AVG(weight), SUM(calories), SUM(steps), SUM(workout_duration) "
+        "FROM health_entries WHERE date >= ? GROUP BY date ORDER BY date",
+        (start_date.isoformat(),)
+    ).fetchall()
+    daily = pd.DataFrame(rows, columns=['date', 'weight', 'calories', 'steps', 'workout_minutes'])
+    return daily.set_index(pd.to_datetime(daily.pop('date'))).astype(float)
+
+def compute_daily_metrics(daily, since, previous=None):
+    """Metrics for every calendar day from ``since`` through the last day of ``daily``
+
+    ``daily`` must start at least METRICS_HISTORY_DAYS before ``since`` (or
+    at the first entry). ``previous`` is the stored metrics row for the day
+    before ``since`` and seeds the weight trend and workout streak.
+    """
+    since = pd.Timestamp(since)
+    days = pd.date_range(min(daily.index[0], since), daily.index[-1], freq='D')
+    daily = daily.reindex(days)
+    metrics = pd.DataFrame(index=days)
     
-    def add_health_entry(self, weight, calories, steps, workout_type, workout_duration):
-        """Add a new health and fitness entry"""
-        entry = HealthEntry(
-            date=datetime.now().date(),
-            weight=weight,
-            calories=calories,
-            steps=steps,
-            workout_type=workout_type,
-            workout_duration=workout_duration
-        )
-        self.session.add(entry)
-        self.session.commit()
+    metrics['weight'] = daily['weight']
+    metrics['weight_7d'] = daily['weight'].rolling(7, min_periods=1).mean()
+    metrics['weight_30d'] = daily['weight'].rolling(30, min_periods=1).mean()
+    metrics['steps'] = daily['steps']
+    metrics['steps_7d'] = daily['steps'].rolling(7, min_periods=1).mean()
+    metrics['steps_30d'] = daily['steps'].rolling(30, min_periods=1).mean()
+    metrics['weekly_steps'] = daily['steps'].fillna(0).groupby(days.to_period('W')).cumsum()
+    metrics['calories'] = daily['calories']
+    metrics['calories_7d'] = daily['calories'].rolling(7, min_periods=1).mean()
+    metrics['calorie_balance_7d'] = (daily['calories'] - CALORIE_TARGET).rolling(7, min_periods=1).sum()
+    metrics['workout_minutes'] = daily['workout_minutes'].fillna(0)
+    metrics = metrics[metrics.index >= since]
     
-    def get_health_entries(self, days=30):
-        """Retrieve health entries for the last specified number of days"""
+    # The trend and streak are recursive, so continue them from the previous day
+    weight = metrics['weight']
+    if previous is not None and previous.weight_trend is not None:
+        weight = pd.concat([pd.Series([previous.weight_trend]), weight])
+    trend = weight.ewm(span=WEIGHT_TREND_SPAN, adjust=False, ignore_na=True).mean()
+    metrics['weight_trend'] = trend.iloc[len(trend) - len(metrics):].to_numpy()
+    
+    active = metrics['workout_minutes'] > 0
+    runs = (~active).cumsum()
+    streak = active.groupby(runs).cumsum()
+    if previous is not None and previous.workout_streak:
+        streak[runs == 0] += previous.workout_streak
+    metrics['workout_streak'] = streak.astype(int)
+    
+    metrics.index.name = 'date'
+    return metrics.reset_index()
+
+def refresh_daily_metrics(connection, since):
+    """Recompute stored metrics from ``since`` on, in the caller's transaction"""
+    last = connection.exec_driver_sql("SELECT MAX(date) FROM daily_metrics").scalar()
+    if last is not None:
+        # Fill any days between the last stored metric and ``since``
+        since = min(since, datetime.fromisoformat(last).date() + timedelta(days=1))
+    else:
+        first = connection.exec_driver_sql("SELECT MIN(date) FROM health_entries").scalar()
+        if first is None:
+            return
+        since = min(since, datetime.fromisoformat(first).date())
+    
+    previous = connection.exec_driver_sql(
+        "SELECT weight_trend, workout_streak FROM daily_metrics WHERE date = ?",
+        ((since - timedelta(days=1)).isoformat(),)
+    ).fetchone()
+    daily = daily_totals(connection, since - timedelta(days=METRICS_HISTORY_DAYS))
+    
+    connection.exec_driver_sql("DELETE FROM daily_metrics WHERE date >= ?", (since.isoformat(),))
+    if daily.empty or daily.index[-1] < pd.Timestamp(since):
+        return
+    metrics = compute_daily_metrics(daily, since, previous)
+    metrics['date'] = metrics['date'].dt.strftime('%Y-%m-%d')
+    metrics = metrics[METRIC_COLUMNS].astype(object).where(metrics[METRIC_COLUMNS].notna(), None)
+    connection.exec_driver_sql(
+        f"INSERT INTO daily_metrics ({', '.join(METRIC_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(METRIC_COLUMNS))})",
+        list(metrics.itertuples(index=False, name=None))
+    )
+
+def rebuild_daily_metrics(connection):
+    """Recompute every stored metric from ``health_entries``"""
+    connection.exec_driver_sql("DELETE FROM daily_metrics")
+    first = connection.exec_driver_sql("SELECT MIN(date) FROM health_entries").scalar()
+    if first is not None:
+        refresh_daily_metrics(connection, datetime.fromisoformat(first).date())
+
+# Schema changes applied on top of create_all, oldest first
+MIGRATIONS = [
+    Migration(1, "Index health entries by date", [
+        "CREATE INDEX IF NOT EXISTS ix_health_entries_date ON health_entries (date)"
+    ]),
+    Migration(2, "Backfill daily_metrics from existing health entries", [
+        rebuild_daily_metrics
+    ]),
+    Migration(3, "Log changed months for Parquet snapshots",
+              snapshots.change_tracking_steps("health_entries", "date")),
+]
+apply_migrations(engine, MIGRATIONS)
+
+# Tables derived from health_entries, rebuilt after out-of-band writes such as benchmark seeding
+DERIVED_TABLE_BUILDERS = [rebuild_daily_metrics]
+
+SNAPSHOT_TABLES = [snapshots.SnapshotTable(HealthEntry.__table__, "date")]
+
+# Columns returned by get_health_data and how they are typed
+HEALTH_COLUMNS = [
+    ('Date', columnar.DATE),
+    ('Weight', columnar.FLOAT),
+    ('Calories', columnar.INT),
+    ('Steps', columnar.INT),
+    ('Workout Type', columnar.CATEGORY),
+    ('Workout Duration', columnar.INT)
+]
+
+# Ranges offered on the insights tab, in days
+INSIGHT_RANGES = {"30 days": 30, "90 days": 90, "1 year": 365, "5 years": 5 * 365}
+
+# Columns returned by get_daily_metrics and how they are typed
+DAILY_METRIC_COLUMNS = [
+    ('Date', columnar.DATE),
+    ('Weight', columnar.FLOAT),
+    ('Weight 7d', columnar.FLOAT),
+    ('Weight 30d', columnar.FLOAT),
+    ('Weight Trend', columnar.FLOAT),
+    ('Steps', columnar.FLOAT),
+    ('Steps 7d', columnar.FLOAT),
+    ('Steps 30d', columnar.FLOAT),
+    ('Weekly Steps', columnar.FLOAT),
+    ('Calories', columnar.FLOAT),
+    ('Calories 7d', columnar.FLOAT),
+    ('Calorie Balance 7d', columnar.FLOAT),
+    ('Workout Minutes', columnar.FLOAT),
+    ('Workout Streak', columnar.INT)
+]
+
+class HealthDataService:
+    """Process-wide health data access shared by every session
+
+    Reads fetch the widest window needed (at least ``window_days``) once and
+    keep it as a DataFrame; narrower windows are sliced from it in memory.
+    Writes go through short-lived scoped sessions and refresh the daily
+    metrics in the same transaction. Cached frames are tagged with the
+    tables' query_cache versions, so writes from anywhere invalidate them.
+    """
+    def __init__(self, session_factory, window_days=90):
+        self.session_factory = session_factory
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self._windows = {}
+    
+    def add_entry(self, weight, calories, steps, workout_type, workout_duration):
+        today = datetime.now().date()
+        with session_scope(self.session_factory) as session:
+            session.add(HealthEntry(
+                date=today,
+                weight=weight,
+                calories=calories,
+                steps=steps,
+                workout_type=workout_type,
+                workout_duration=workout_duration
+            ))
+            session.flush()
+            refresh_daily_metrics(session.connection(), today)
+        self.invalidate()
+    
+    def invalidate(self):
+        query_cache.invalidate(engine, "health_entries", "daily_metrics")
+    
+    def _window(self, sql, columns, days):
         start_date = datetime.now().date() - timedelta(days=days)
-        entries = self.session.query(HealthEntry).filter(
-            HealthEntry.date >= start_date
-        ).order_by(HealthEntry.date).all()
-        
-        return entries
+        versions = query_cache.versions(engine, "health_entries", "daily_metrics")
+        with self._lock:
+            frame_versions, frame_start, frame = self._windows.get(sql, (None, None, None))
+            if frame_versions != versions or start_date < frame_start:
+                frame_start = min(start_date, datetime.now().date() - timedelta(days=self.window_days))
+                frame = columnar.read_frame(engine, sql, (frame_start.isoformat(),), columns)
+                self._windows[sql] = (versions, frame_start, frame)
+        if start_date == frame_start:
+            return frame.copy()
+        return frame[frame['Date'] >= pd.Timestamp(start_date)].reset_index(drop=True)
+    
+    def get_frame(self, days=30):
+        """Entries for the last ``days`` days, sliced from the cached window"""
+        return self._window(
+            "SELECT date, weight, calories, steps, workout_type, workout_duration "
+            "FROM health_entries WHERE date >= ? ORDER BY date",
+            HEALTH_COLUMNS, days
+        )
+    
+    def get_metrics(self, days=30):
+        """Stored daily metrics for the last ``days`` days, sliced from the cached window"""
+        return self._window(
+            f"SELECT {', '.join(METRIC_COLUMNS)} FROM daily_metrics WHERE date >= ? ORDER BY date",
+            DAILY_METRIC_COLUMNS, days
+        )
+    
+    def get_snapshot(self, days=30):
+        """Entries and daily metrics for the last ``days`` days from the Parquet snapshot
+
+        The metrics are recomputed from every snapshotted entry, since the
+        weight trend and workout streak carry over from the first day.
+        Returns None if the snapshot is missing or stale.
+        """
+        return self._snapshot(datetime.now().date() - timedelta(days=days))
     
-    def analyze_health_data(self, entries):
-        """Analyze health and fitness data"""
-        if not entries:
+    # Keyed on the start date, so a result cached before midnight is not reused after it
+    @query_cache.cached(engine, "health_entries", "snapshot_changes")
+    def _snapshot(self, start_date):
+        entries = snapshots.read_snapshot(engine, SNAPSHOT_TABLES[0], columns=[
+            'date', 'weight', 'calories', 'steps', 'workout_type', 'workout_duration'
+        ])
+        if entries is None:
             return None
+        entries = entries.dropna(subset=['date'])
+        entries['date'] = pd.to_datetime(entries['date'])
+        entries = entries.sort_values('date', kind='stable').reset_index(drop=True)
+        start = pd.Timestamp(start_date)
         
-        # Convert entries to DataFrame
-        data = [{
-            'Date': entry.date,
-            'Weight': entry.weight,
-            'Calories': entry.calories,
-            'Steps': entry.steps,
-            'Workout Type': entry.workout_type,
-            'Workout Duration': entry.workout_duration
-        } for entry in entries]
-        
-        df = pd.DataFrame(data)
-        return df
+        metrics = pd.DataFrame(columns=METRIC_COLUMNS)
+        if not entries.empty:
+            # Same aggregates as daily_totals; min_count keeps all-missing days NaN like SQL SUM
+            grouped = entries.groupby('date')
+            daily = pd.DataFrame({
+                'weight': grouped['weight'].mean(),
+                'calories': grouped['calories'].sum(min_count=1),
+                'steps': grouped['steps'].sum(min_count=1),
+                'workout_minutes': grouped['workout_duration'].sum(min_count=1)
+            }).astype(float)
+            metrics = compute_daily_metrics(daily, daily.index[0])[METRIC_COLUMNS]
+            metrics = metrics[metrics['date'] >= start]
+        metrics = metrics.set_axis([name for name, _ in DAILY_METRIC_COLUMNS], axis=1)
+        entries = entries[entries['date'] >= start].set_axis([name for name, _ in HEALTH_COLUMNS], axis=1)
+        return entries.reset_index(drop=True), metrics.reset_index(drop=True)
+
+# Shared by every session in this process
+health_data = HealthDataService(Session)
+
+class HealthFitnessTracker:
+    def __init__(self, service=health_data):
+        self.service = service
+    
+    def add_health_entry(self, weight, calories, steps, workout_type, workout_duration):
+        """Add a new health and fitness entry"""
+        self.service.add_entry(weight, calories, steps, workout_type, workout_duration)
+    
+    def get_health_data(self, days=30):
+        """Entries for the last ``days`` days as a typed, columnar DataFrame"""
+        return self.service.get_frame(days)
+    
+    def get_daily_metrics(self, days=30):
+        """Rolling weight, step, calorie and workout metrics per day"""
+        return self.service.get_metrics(days)
+    
+    def get_snapshot_data(self, days=30):
+        """Entries and daily metrics read from the Parquet snapshot; None if missing or stale"""
+        return self.service.get_snapshot(days)
 
 def main():
     st.title("🏋️ Personal Health & Fitness Tracker")
@@ -114,25 +371,43 @@ def main():
     with tab2:
         st.header("Health Insights")
         
-        # Retrieve health entries
-        entries = tracker.get_health_entries()
+        range_label = st.selectbox("Range", list(INSIGHT_RANGES), key="insight_range")
+        days = INSIGHT_RANGES[range_label]
         
-        if entries:
-            # Analyze health data
-            health_df = tracker.analyze_health_data(entries)
+        # Long ranges can be scanned from the Parquet snapshot instead of SQLite
+        snapshot_data = None
+        if st.toggle("Read from Parquet snapshot", key="use_snapshot"):
+            snapshot_data = tracker.get_snapshot_data(days)
+            if snapshot_data is None:
+                st.info("No up-to-date snapshot of the health log; reading the live database.")
+        if snapshot_data is not None:
+            health_df, metrics = snapshot_data
+        else:
+            metrics = tracker.get_daily_metrics(days)
+        
+        if not metrics.empty:
+            latest = metrics.iloc[-1]
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Weight Trend", f"{metrics['Weight Trend'].dropna().iloc[-1]:.1f} kg")
+            col2.metric("Steps (7-day avg)", f"{latest['Steps 7d']:,.0f}")
+            col3.metric("Calorie Balance (7 days)", f"{latest['Calorie Balance 7d']:+,.0f}")
+            col4.metric("Workout Streak", f"{latest['Workout Streak']} days")
             
             # Weight tracking
             st.subheader("Weight Tracking")
+            weight_series = ['Weight', 'Weight 7d', 'Weight 30d', 'Weight Trend']
             fig_weight = px.line(
-                health_df, 
+                downsampling.lttb(metrics, 'Date', weight_series), 
                 x='Date', 
-                y='Weight', 
+                y=weight_series, 
                 title='Weight Progress'
             )
             st.plotly_chart(fig_weight)
             
             # Workout analysis
             st.subheader("Workout Analysis")
+            if snapshot_data is None:
+                health_df = tracker.get_health_data(days)
             workout_counts = health_df['Workout Type'].value_counts()
             fig_workout = px.pie(
                 values=workout_counts.values, 
@@ -143,30 +418,47 @@ def main():
             
             # Daily steps
             st.subheader("Daily Steps")
-            fig_steps = px.bar(
-                health_df, 
+            steps = downsampling.lttb(metrics, 'Date', ['Steps', 'Steps 7d'])
+            fig_steps = go.Figure([
+                go.Bar(x=steps['Date'], y=steps['Steps'], name='Steps'),
+                go.Scatter(x=steps['Date'], y=steps['Steps 7d'], name='7-day average')
+            ])
+            fig_steps.update_layout(title='Daily Step Count')
+            st.plotly_chart(fig_steps)
+            
+            weekly_steps = metrics.groupby(metrics['Date'].dt.to_period('W'))['Weekly Steps'].last()
+            fig_weekly = px.bar(
+                x=weekly_steps.index.start_time, 
+                y=weekly_steps.values, 
+                labels={'x': 'Week', 'y': 'Steps'}, 
+                title='Weekly Step Totals'
+            )
+            st.plotly_chart(fig_weekly)
+            
+            # Calories
+            st.subheader("Calorie Balance")
+            fig_calories = px.line(
+                downsampling.lttb(metrics, 'Date', 'Calorie Balance 7d'), 
                 x='Date', 
-                y='Steps', 
-                title='Daily Step Count'
+                y='Calorie Balance 7d', 
+                title=f'7-day Balance Against {CALORIE_TARGET:,} kcal/day'
             )
-            st.plotly_chart(fig_steps)
+            st.plotly_chart(fig_calories)
         else:
             st.warning("No health data available. Start logging your health data!")
     
     with tab3:
         st.header("Progress Tracking")
         
-        # Retrieve health entries
-        entries = tracker.get_health_entries(days=90)
+        weight_trend = tracker.get_daily_metrics(days=90)['Weight Trend'].dropna()
         
-        if entries:
-            health_df = tracker.analyze_health_data(entries)
+        if not weight_trend.empty:
             
             # Goal setting and tracking
             st.subheader("Health Goals")
             
-            # Weight goal
-            current_weight = health_df['Weight'].iloc[-1]
+            # Weight goal, measured against the smoothed trend rather than the last weigh-in
+            current_weight = float(weight_trend.iloc[-1])
             goal_weight = st.number_input(
                 "Goal Weight (kg)", 
                 min_value=0.0, 
@@ -178,7 +470,7 @@ def main():
             
             # Progress bar
             st.metric("Weight Progress", f"{abs(weight_progress):.2f}%")
-            st.progress(abs(weight_progress) / 100)
+            st.progress(min(abs(weight_progress) / 100, 1.0))
             
             # Recommendations
             st.subheader("Personalized Recommendations")
@@ -1,8 +1,14 @@
 import streamlit as st
 import importlib.util
+import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from common import instrumentation, lazy_imports
+
 # Define project categories
 CATEGORIES = {
     "Financial Tools": [
@@ -29,31 +35,115 @@ CATEGORIES = {
     ]
 }
 
-def load_project(project_name):
-    """Load and run the selected project"""
-    import sys
-    try:
-        # Remove 'app' from sys.modules to avoid caching issues
-        if 'app' in sys.modules:
-            del sys.modules['app']
-        # Import the project module
-        module_path = os.path.join(os.getcwd(), project_name, "app.py")
-        spec = importlib.util.spec_from_file_location("app", module_path)
+# Projects are imported under this prefix so they never collide with each other
+PROJECTS_PACKAGE = "projects"
+
+class ProjectRegistry:
+    """Loads each project's app.py once and keeps it until the file changes"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._modules = {}
+        self._lock = threading.Lock()
+        self._project_locks = {}
+
+    def module_name(self, project_name):
+        return f"{PROJECTS_PACKAGE}.{project_name}"
+
+    def module_path(self, project_name):
+        return self.root / project_name / "app.py"
+
+    def get(self, project_name):
+        """Return the project's module, re-executing app.py only if its mtime changed"""
+        module_path = self.module_path(project_name)
+        mtime = module_path.stat().st_mtime_ns
+        with self._lock:
+            project_lock = self._project_locks.setdefault(project_name, threading.Lock())
+        # Per-project lock so a background preload never blocks other projects
+        with project_lock:
+            cached = self._modules.get(project_name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            module = self._load(project_name, module_path)
+            self._modules[project_name] = (mtime, module)
+            return module
+
+    def _load(self, project_name, module_path):
+        module_name = self.module_name(project_name)
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
         module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            sys.modules.pop(module_name, None)
+            raise
+        return module
+
+    def loaded(self):
+        """Names of the projects currently held in the registry"""
+        return list(self._modules)
+
+@st.cache_resource
+def get_project_registry():
+    """Process-wide registry shared by every rerun and session"""
+    return ProjectRegistry(os.getcwd())
+
+# Set DASHBOARD_PRELOAD=0 to turn off background warming
+PRELOAD_ENABLED = os.environ.get("DASHBOARD_PRELOAD", "1") != "0"
+
+class ProjectPreloader:
+    """Imports projects and their lazy dependencies on a small thread pool"""
+
+    def __init__(self, registry, max_workers=2):
+        self.registry = registry
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload")
+        self._submitted = set()
+        self._lock = threading.Lock()
+
+    def warm(self, projects):
+        """Queue every project not yet warmed; returns immediately"""
+        with self._lock:
+            pending = [p for p in projects if p not in self._submitted]
+            self._submitted.update(pending)
+        for project_name in pending:
+            self._executor.submit(self._warm_one, project_name)
+
+    def _warm_one(self, project_name):
+        try:
+            module = self.registry.get(project_name)
+            lazy_imports.preload(module)
+        except Exception:
+            # Broken projects report their error when they are actually selected
+            pass
+
+@st.cache_resource
+def get_preloader():
+    return ProjectPreloader(get_project_registry())
+
+def load_project(project_name, trace=None):
+    """Load and run the selected project, timing each phase into ``trace`` if given"""
+    registry = get_project_registry()
+    module_path = registry.module_path(project_name)
+    try:
+        with instrumentation.timed(trace, "load_ms"):
+            module = registry.get(project_name)
+        if trace is not None:
+            instrumentation.watch_module(module)
         
-        # For hangman game, we need to create an instance
-        if project_name == "hangman_game":
-            game = module.HangmanGame()
-            module.main()
-        else:
-            # Run the project's main function
-            if hasattr(module, "main"):
+        with instrumentation.timed(trace, "main_ms"):
+            # For hangman game, we need to create an instance
+            if project_name == "hangman_game":
+                game = module.HangmanGame()
                 module.main()
-            elif hasattr(module, "run"):
-                module.run()
             else:
-                st.error(f"Project {project_name} doesn't have a main/run function")
+                # Run the project's main function
+                if hasattr(module, "main"):
+                    module.main()
+                elif hasattr(module, "run"):
+                    module.run()
+                else:
+                    st.error(f"Project {project_name} doesn't have a main/run function")
     except Exception as e:
         st.error(f"Error loading {project_name}: {str(e)}")
         st.error(f"Error details: {str(e)}")
@@ -77,6 +167,73 @@ def get_project_description(project):
     }
     return descriptions.get(project, "No description available")
 
+def render_profiler_panel():
+    """Hidden startup profiler, shown only with ?profiler=1 in the URL"""
+    from common import startup_profiler
+
+    with st.sidebar.expander("Startup Profiler"):
+        if st.button("Profile all projects"):
+            status = st.empty()
+            report = startup_profiler.build_report(
+                CATEGORIES,
+                progress=lambda name: status.write(f"Profiling {name}...")
+            )
+            status.empty()
+            st.session_state.startup_report = report
+
+        report = st.session_state.get("startup_report")
+        if report:
+            st.dataframe(startup_profiler.summarize(report))
+            st.download_button(
+                "Download report",
+                json.dumps(report, indent=2),
+                file_name="startup_report.json",
+                mime="application/json"
+            )
+
+# Number of rerun traces kept per session
+MAX_TRACES = 50
+
+# Append every trace as a JSON line to this file when set
+TRACE_FILE = os.environ.get("DASHBOARD_TRACE_FILE")
+
+def record_trace(trace):
+    traces = st.session_state.setdefault("rerun_traces", [])
+    traces.append(trace)
+    del traces[:-MAX_TRACES]
+    if TRACE_FILE:
+        instrumentation.append_json_lines(TRACE_FILE, trace)
+
+def render_instrumentation_panel():
+    """Timings of the latest rerun plus a JSON lines export of this session's traces"""
+    traces = st.session_state.get("rerun_traces", [])
+    if not traces:
+        return
+    trace = traces[-1]
+    with st.sidebar.expander("Rerun Instrumentation", expanded=False):
+        summary = trace.summary()
+        col1, col2 = st.columns(2)
+        col1.metric("Module load", f"{summary['load_ms'] or 0:.1f} ms")
+        col2.metric("main()", f"{summary['main_ms'] or 0:.1f} ms")
+        col1.metric(f"SQL ({len(trace.queries)})", f"{summary['sql_ms']:.1f} ms")
+        col2.metric(f"HTTP ({len(trace.http_calls)})", f"{summary['http_ms']:.1f} ms")
+        st.metric(f"Figures ({len(trace.figures)})", f"{summary['figure_ms']:.1f} ms")
+        if trace.queries:
+            st.caption("SQL statements")
+            st.dataframe(trace.queries, hide_index=True)
+        if trace.http_calls:
+            st.caption("HTTP calls")
+            st.dataframe(trace.http_calls, hide_index=True)
+        if trace.figures:
+            st.caption("Figures")
+            st.dataframe(trace.figures, hide_index=True)
+        st.download_button(
+            "Export traces (JSON lines)",
+            instrumentation.to_json_lines(traces),
+            file_name="rerun_traces.jsonl",
+            mime="application/x-ndjson"
+        )
+
 def main():
     st.set_page_config(
         page_title="Python Projects Dashboard",
@@ -108,9 +265,24 @@ def main():
     {get_project_description(project)}
     """)
     
+    if st.query_params.get("profiler") == "1":
+        render_profiler_panel()
+    
+    instrumented = st.sidebar.toggle("Instrument reruns", key="instrumentation_enabled")
+    
     # Load and display selected project
     if project:
-        load_project(project)
+        if instrumented:
+            with instrumentation.trace_rerun(project) as trace:
+                load_project(project, trace)
+            record_trace(trace)
+            render_instrumentation_panel()
+        else:
+            load_project(project)
+    
+    # The page is on screen now; warm the rest of the category in the background
+    if PRELOAD_ENABLED:
+        get_preloader().warm(projects)
 
 if __name__ == "__main__":
     main()
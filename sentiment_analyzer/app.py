@@ -1,16 +1,22 @@
 import streamlit as st
-from textblob import TextBlob
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import sys
+from pathlib import Path
 
-# Initialize session state
-if 'sentiment_history' not in st.session_state:
-    st.session_state.sentiment_history = []
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common.lazy_imports import lazy_import
+
+# Heavy dependencies are only imported when first used
+textblob = lazy_import("textblob")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
 
 def analyze_sentiment(text):
     """Analyze text sentiment and return detailed analysis"""
-    blob = TextBlob(text)
+    blob = textblob.TextBlob(text)
     polarity = blob.sentiment.polarity
     subjectivity = blob.sentiment.subjectivity
     
@@ -28,7 +34,7 @@ def analyze_sentiment(text):
     # Get word-by-word analysis
     word_analysis = []
     for word in blob.words:
-        word_blob = TextBlob(word)
+        word_blob = textblob.TextBlob(word)
         word_polarity = word_blob.sentiment.polarity
         word_subjectivity = word_blob.sentiment.subjectivity
         word_analysis.append({
@@ -60,6 +66,10 @@ def plot_sentiment_history():
         st.pyplot(fig)
 
 def main():
+    # Initialize session state
+    if 'sentiment_history' not in st.session_state:
+        st.session_state.sentiment_history = []
+
     st.title("📊 Sentiment Analyzer")
     st.write("""
         Analyze the sentiment of any text using TextBlob. 
@@ -1,36 +1,92 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.graph_objs as go
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common import market_data
+from common.lazy_imports import lazy_import
+import inspect
 import random
 
+# Heavy dependencies are only imported when first used
+pd = lazy_import("pandas")
+go = lazy_import("plotly.graph_objs")
+np = lazy_import("numpy")
+downsampling = lazy_import("common.downsampling")
+valuation = lazy_import("common.valuation")
+backtest = lazy_import("common.backtest")
+risk = lazy_import("common.risk")
+
+# Chart periods offered, with the finest bar interval Yahoo Finance serves for each
+CHART_INTERVALS = {"5d": "5m", "1mo": "1h", "6mo": "1h", "1y": "1d", "5y": "1d", "max": "1d"}
+
+# Daily history offered to backtests and risk simulations
+BACKTEST_PERIODS = ["1y", "2y", "5y", "10y", "max"]
+
+# Monte Carlo models and path counts offered for portfolio risk
+RISK_METHODS = {"gbm": "Correlated GBM", "bootstrap": "Historical bootstrap"}
+RISK_PATHS = [10_000, 100_000, 1_000_000]
+
+def strategy_parameters(strategy):
+    """Tunable parameters of a strategy function with their defaults"""
+    parameters = list(inspect.signature(strategy).parameters.values())[1:]
+    return {parameter.name: parameter.default for parameter in parameters}
+
+def parse_values(text, default):
+    """Comma-separated sweep values, converted to the type of ``default``"""
+    return [type(default)(value.strip()) for value in text.split(",") if value.strip()]
+
+# Yahoo Finance unless MARKET_DATA_PROVIDER=local selects the offline store
+provider = market_data.get_provider()
+
+# Shared by every session: repeated requests within the TTL reuse one fetch
+quotes = market_data.QuoteCache(provider.history, fetch_many=provider.history_many)
+
 class StockMarketSimulator:
     def __init__(self, initial_balance=10000):
         self.initial_balance = initial_balance
         self.balance = initial_balance
         self.portfolio = {}
+        self.cost_basis = {}
         self.transaction_history = []
 
-    def get_stock_data(self, ticker, period='1mo'):
-        """Fetch stock data from Yahoo Finance"""
+    def get_stock_data(self, ticker, period='1mo', interval='1d'):
+        """Fetch stock data from the market data provider, through the shared quote cache"""
         try:
-            stock = yf.Ticker(ticker)
-            data = stock.history(period=period)
-            return data
+            return quotes.history(ticker, period, interval)
         except Exception as e:
             st.error(f"Error fetching stock data: {e}")
             return None
 
+    def get_last_price(self, ticker):
+        """Latest close for a ticker, or None when it cannot be priced"""
+        try:
+            return quotes.last_price(ticker)
+        except Exception as e:
+            st.error(f"Error fetching stock data: {e}")
+            return None
+
+    def get_last_prices(self, tickers):
+        """Latest closes for several tickers from one bulk request, None where unpriced"""
+        try:
+            return quotes.last_prices(tickers)
+        except Exception as e:
+            st.error(f"Error fetching stock data: {e}")
+            return [None] * len(tickers)
+
     def buy_stock(self, ticker, amount):
         """Simulate buying stocks"""
-        stock_data = self.get_stock_data(ticker)
-        if stock_data is not None and not stock_data.empty:
-            current_price = stock_data['Close'].iloc[-1]
+        current_price = self.get_last_price(ticker)
+        if current_price is not None:
             shares = amount / current_price
             
             if amount <= self.balance:
                 self.balance -= amount
                 self.portfolio[ticker] = self.portfolio.get(ticker, 0) + shares
+                self.cost_basis[ticker] = self.cost_basis.get(ticker, 0) + amount
                 
                 # Record transaction
                 self.transaction_history.append({
@@ -48,18 +104,20 @@ class StockMarketSimulator:
 
     def sell_stock(self, ticker, shares):
         """Simulate selling stocks"""
-        stock_data = self.get_stock_data(ticker)
-        if stock_data is not None and not stock_data.empty:
-            current_price = stock_data['Close'].iloc[-1]
+        current_price = self.get_last_price(ticker)
+        if current_price is not None:
             
             if ticker in self.portfolio and self.portfolio[ticker] >= shares:
                 sale_amount = shares * current_price
                 self.balance += sale_amount
+                # Cost basis is released at the average cost of the position
+                self.cost_basis[ticker] = self.cost_basis.get(ticker, 0) * (1 - shares / self.portfolio[ticker])
                 self.portfolio[ticker] -= shares
                 
                 # Remove ticker if no shares left
                 if self.portfolio[ticker] == 0:
                     del self.portfolio[ticker]
+                    self.cost_basis.pop(ticker, None)
                 
                 # Record transaction
                 self.transaction_history.append({
@@ -75,15 +133,18 @@ class StockMarketSimulator:
                 st.warning("Insufficient shares")
                 return False
 
-    def calculate_portfolio_value(self):
+    def value_holdings(self):
+        """Value every holding from one bulk price request"""
+        tickers = list(self.portfolio)
+        shares = np.fromiter(self.portfolio.values(), dtype=np.float64, count=len(tickers))
+        cost_basis = np.array([self.cost_basis.get(ticker, 0.0) for ticker in tickers], dtype=np.float64)
+        return valuation.value_positions(tickers, shares, cost_basis, self.get_last_prices(tickers))
+
+    def calculate_portfolio_value(self, holdings=None):
         """Calculate current portfolio value"""
-        total_value = self.balance
-        for ticker, shares in self.portfolio.items():
-            stock_data = self.get_stock_data(ticker)
-            if stock_data is not None and not stock_data.empty:
-                current_price = stock_data['Close'].iloc[-1]
-                total_value += shares * current_price
-        return total_value
+        if holdings is None:
+            holdings = self.value_holdings()
+        return self.balance + valuation.totals(holdings)["market_value"]
 
 def main():
     st.title("📈 Stock Market Simulator")
@@ -95,25 +156,27 @@ def main():
     simulator = st.session_state.simulator
     
     # Tabs
-    tab1, tab2, tab3 = st.tabs(["Trading", "Portfolio", "Performance"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Trading", "Portfolio", "Performance", "Backtest"])
     
     with tab1:
         st.header("Stock Trading")
         
         # Stock selection
         ticker = st.text_input("Enter Stock Ticker (e.g., AAPL, GOOGL)", value="AAPL")
+        period = st.selectbox("Period", list(CHART_INTERVALS), index=1)
         
-        # Fetch and display stock data
-        stock_data = simulator.get_stock_data(ticker)
+        # Fetch and display stock data; shorter periods come back at finer intervals
+        stock_data = simulator.get_stock_data(ticker, period, CHART_INTERVALS[period])
         
         if stock_data is not None and not stock_data.empty:
-            # Stock price chart
+            # Stock price chart, resampled to a bounded number of bars
+            bars = downsampling.resample_ohlc(stock_data)
             fig = go.Figure(data=[go.Candlestick(
-                x=stock_data.index,
-                open=stock_data['Open'],
-                high=stock_data['High'],
-                low=stock_data['Low'],
-                close=stock_data['Close']
+                x=bars.index,
+                open=bars['Open'],
+                high=bars['High'],
+                low=bars['Low'],
+                close=bars['Close']
             )])
             fig.update_layout(title=f'{ticker} Stock Price')
             st.plotly_chart(fig)
@@ -143,20 +206,65 @@ def main():
         # Current balance
         st.metric("Cash Balance", f"${simulator.balance:.2f}")
         
-        # Portfolio holdings
+        # Portfolio holdings, priced together
         st.subheader("Current Holdings")
-        for ticker, shares in simulator.portfolio.items():
-            stock_data = simulator.get_stock_data(ticker)
-            if stock_data is not None and not stock_data.empty:
-                current_price = stock_data['Close'].iloc[-1]
-                total_value = shares * current_price
-                
-                st.write(f"{ticker}: {shares:.2f} shares (${total_value:.2f})")
+        holdings = simulator.value_holdings()
+        if not holdings.empty:
+            st.dataframe(holdings.set_index("ticker").round(2))
+            unpriced = valuation.totals(holdings)["unpriced"]
+            if unpriced:
+                st.warning(f"No price available for {unpriced} holding(s)")
         
         # Total portfolio value
-        portfolio_value = simulator.calculate_portfolio_value()
+        portfolio_value = simulator.calculate_portfolio_value(holdings)
         st.metric("Total Portfolio Value", f"${portfolio_value:.2f}")
+        st.metric("Unrealized P&L", f"${valuation.totals(holdings)['pnl']:.2f}")
         st.metric("Total Gain/Loss", f"${portfolio_value - simulator.initial_balance:.2f}")
+
+        # Monte Carlo risk of the priced holdings
+        st.subheader("Risk")
+        priced = holdings[holdings["price"].notna()]
+        if priced.empty:
+            st.write("No priced holdings to simulate")
+        else:
+            with st.form("risk_form"):
+                col1, col2, col3 = st.columns(3)
+                method = col1.selectbox("Model", list(RISK_METHODS), format_func=RISK_METHODS.get)
+                horizon = col2.number_input("Horizon (trading days)", min_value=5, max_value=1000, value=250)
+                paths = col3.selectbox("Paths", RISK_PATHS, index=1, format_func="{:,}".format)
+                returns_period = st.selectbox("History for returns", BACKTEST_PERIODS, index=1)
+                run_risk = st.form_submit_button("Simulate")
+
+            if run_risk:
+                try:
+                    universe = backtest.align_universe(
+                        quotes.history_many(priced["ticker"].tolist(), returns_period, "1d")
+                    )
+                    values0 = priced.set_index("ticker")["market_value"].reindex(universe.tickers).to_numpy()
+                    st.session_state.risk_result = risk.simulate(
+                        values0, risk.log_returns(universe.close), int(horizon), paths, method
+                    )
+                except ValueError as e:
+                    st.error(f"Risk simulation failed: {e}")
+
+            result = st.session_state.get("risk_result")
+            if result is not None:
+                columns = st.columns(2 * len(result.var))
+                for i, level in enumerate(result.var):
+                    columns[2 * i].metric(f"VaR {level:.0%}", f"${result.var[level]:,.2f}")
+                    columns[2 * i + 1].metric(f"CVaR {level:.0%}", f"${result.cvar[level]:,.2f}")
+
+                fan = result.fan
+                fig = go.Figure([
+                    go.Scatter(x=fan.index, y=fan["p95"], line=dict(width=0), showlegend=False),
+                    go.Scatter(x=fan.index, y=fan["p5"], fill="tonexty", line=dict(width=0), name="5th-95th percentile"),
+                    go.Scatter(x=fan.index, y=fan["p75"], line=dict(width=0), showlegend=False),
+                    go.Scatter(x=fan.index, y=fan["p25"], fill="tonexty", line=dict(width=0), name="25th-75th percentile"),
+                    go.Scatter(x=fan.index, y=fan["p50"], name="Median"),
+                ])
+                fig.update_layout(title=f"Simulated Holdings Value ({len(result.pnl):,} paths)",
+                                  xaxis_title="Trading days ahead", yaxis_title="Value ($)")
+                st.plotly_chart(fig)
     
     with tab3:
         st.header("Transaction History")
@@ -168,5 +276,76 @@ def main():
         else:
             st.write("No transactions yet")
 
+    with tab4:
+        st.header("Strategy Backtest")
+
+        strategy_name = st.selectbox("Strategy", list(backtest.STRATEGIES))
+        strategy = backtest.STRATEGIES[strategy_name]
+        defaults = strategy_parameters(strategy)
+
+        with st.form("backtest_form"):
+            tickers_text = st.text_input("Universe (comma-separated tickers)", value="AAPL, MSFT, GOOGL, AMZN")
+            history_period = st.selectbox("History", BACKTEST_PERIODS, index=2)
+            col1, col2, col3 = st.columns(3)
+            fee_bps = col1.number_input("Fee (bps)", min_value=0.0, value=1.0)
+            slippage_bps = col2.number_input("Slippage (bps)", min_value=0.0, value=5.0)
+            sizing = col3.selectbox("Position sizing", backtest.SIZINGS)
+
+            params = {}
+            for name, default in defaults.items():
+                if isinstance(default, bool):
+                    params[name] = st.checkbox(name, value=default)
+                elif isinstance(default, int):
+                    # Windows and lookbacks are counted in bars
+                    params[name] = st.number_input(name, min_value=1, value=default)
+                else:
+                    params[name] = st.number_input(name, value=default)
+            run_backtest = st.form_submit_button("Run backtest")
+
+            st.caption("Sweep: comma-separated values per parameter, every combination is tested")
+            grid_text = {
+                name: st.text_input(f"{name} values", value=str(default))
+                for name, default in defaults.items() if not isinstance(default, bool)
+            }
+            run_sweep = st.form_submit_button("Run parameter sweep")
+
+        if run_backtest or run_sweep:
+            tickers = [ticker.strip().upper() for ticker in tickers_text.split(",") if ticker.strip()]
+            options = {"fee_bps": fee_bps, "slippage_bps": slippage_bps, "sizing": sizing}
+            try:
+                universe = backtest.align_universe(quotes.history_many(tickers, history_period, "1d"))
+                if run_backtest:
+                    st.session_state.backtest_result = backtest.run(universe, strategy, params, **options)
+                else:
+                    grid = {name: parse_values(text, defaults[name]) for name, text in grid_text.items()}
+                    fixed = {name: [value] for name, value in params.items() if name not in grid}
+                    st.session_state.backtest_sweep = backtest.sweep(universe, strategy, {**grid, **fixed}, **options)
+            except ValueError as e:
+                st.error(f"Backtest failed: {e}")
+
+        result = st.session_state.get("backtest_result")
+        if result is not None:
+            stats = result.stats
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Total Return", f"{stats['total_return']:.1%}")
+            col2.metric("Sharpe", f"{stats['sharpe']:.2f}")
+            col3.metric("Max Drawdown", f"{stats['max_drawdown']:.1%}")
+            col4.metric("Turnover (per year)", f"{stats['turnover']:.1f}x")
+
+            frame = pd.DataFrame({"Date": result.equity.index, "Equity": result.equity.to_numpy(),
+                                  "Drawdown": result.drawdown.to_numpy()})
+            frame = downsampling.lttb(frame, "Date", ["Equity", "Drawdown"])
+            fig = go.Figure(go.Scatter(x=frame["Date"], y=frame["Equity"], name="Equity"))
+            fig.update_layout(title="Equity Curve")
+            st.plotly_chart(fig)
+            fig = go.Figure(go.Scatter(x=frame["Date"], y=frame["Drawdown"], fill="tozeroy", name="Drawdown"))
+            fig.update_layout(title="Drawdown", yaxis_tickformat=".0%")
+            st.plotly_chart(fig)
+
+        results = st.session_state.get("backtest_sweep")
+        if results is not None and not results.empty:
+            st.subheader(f"Parameter Sweep ({len(results):,} combinations, best Sharpe first)")
+            st.dataframe(results.head(50).round(4))
+
 if __name__ == "__main__":
     main()
@@ -1,15 +1,30 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objs as go
-from sqlalchemy import create_engine, Column, Integer, String, Date, Boolean
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common import query_cache, snapshots
+from common.lazy_imports import lazy_import
+from common.migrations import Migration, add_column, apply_migrations
+from common.storage import get_engine, session_scope
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, delete, or_, tuple_, update
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
+import math
+
+# Heavy dependencies are only imported when first used
+pd = lazy_import("pandas")
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objs")
 
 # SQLAlchemy Setup
 Base = declarative_base()
-engine = create_engine('sqlite:///task_manager.db')
-Session = sessionmaker(bind=engine)
+engine = get_engine('task_manager.db')
+Session = sessionmaker(bind=engine, expire_on_commit=False)
 
 class Task(Base):
     __tablename__ = 'tasks'
@@ -19,43 +34,364 @@ class Task(Base):
     priority = Column(String)
     due_date = Column(Date)
     completed = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    completed_at = Column(DateTime)
 
 Base.metadata.create_all(engine)
 
+# Schema changes applied on top of create_all, oldest first
+MIGRATIONS = [
+    Migration(1, "Index tasks by completion and due date", [
+        "CREATE INDEX IF NOT EXISTS ix_tasks_completed_due_date ON tasks (completed, due_date)"
+    ]),
+    Migration(2, "Index tasks by completion, priority and due date", [
+        "CREATE INDEX IF NOT EXISTS ix_tasks_completed_priority_due_date "
+        "ON tasks (completed, priority, due_date)"
+    ]),
+    Migration(3, "Track when tasks are created and completed", [
+        add_column("tasks", "created_at", "DATETIME"),
+        add_column("tasks", "completed_at", "DATETIME"),
+        "CREATE INDEX IF NOT EXISTS ix_tasks_completed_completed_at "
+        "ON tasks (completed, completed_at, created_at)"
+    ]),
+    Migration(4, "Log changed months for Parquet snapshots",
+              snapshots.change_tracking_steps("tasks", "due_date")),
+]
+apply_migrations(engine, MIGRATIONS)
+
+SNAPSHOT_TABLES = [snapshots.SnapshotTable(Task.__table__, "due_date")]
+
+PRIORITIES = ["Low", "Medium", "High"]
+SORT_ORDERS = ["Due date", "Priority"]
+
+# Tasks rendered per page of the task list
+PAGE_SIZE = 25
+
 def add_task(title, description, priority, due_date):
-    session = Session()
-    task = Task(
-        title=title, 
-        description=description, 
-        priority=priority, 
-        due_date=due_date,
-        completed=False
-    )
-    session.add(task)
-    session.commit()
-    session.close()
+    with session_scope(Session) as session:
+        session.add(Task(
+            title=title, 
+            description=description, 
+            priority=priority, 
+            due_date=due_date,
+            completed=False
+        ))
+    query_cache.invalidate(engine, "tasks")
+
+def _filtered(query, completed=None, priority=None, search=None):
+    if completed is not None:
+        query = query.filter(Task.completed == completed)
+    if priority:
+        query = query.filter(Task.priority == priority)
+    if search:
+        query = query.filter(or_(
+            Task.title.contains(search, autoescape=True),
+            Task.description.contains(search, autoescape=True)
+        ))
+    return query
+
+@query_cache.cached(engine, "tasks")
+def get_task_page(after=None, page_size=PAGE_SIZE, completed=None, priority=None, search=None, sort="Due date"):
+    """One page of tasks, keyset-paginated on (priority group, due_date, id)
+
+    Sorting by priority walks the priority groups from High to Low, each in
+    due date order, so every query is a range scan on
+    (completed, priority, due_date) rather than a sort of the whole table.
+    ``after`` is the key of the last row of the previous page. Returns the
+    page's rows and the key of the next page, or None on the last one.
+    """
+    if sort == "Priority":
+        groups = [group for group in reversed(PRIORITIES) if priority in (None, group)]
+    else:
+        groups = [priority]
+    if after is not None:
+        groups = groups[groups.index(after[0]):]
+
+    rows = []
+    with session_scope(Session) as session:
+        for group in groups:
+            query = _filtered(session.query(
+                Task.id, Task.title, Task.description, Task.priority,
+                Task.due_date, Task.completed, Task.completed_at
+            ), completed, group, search)
+            if after is not None and after[0] == group:
+                query = query.filter(tuple_(Task.due_date, Task.id) > tuple(after[1:]))
+            rows += query.order_by(
+                Task.due_date, Task.id
+            ).limit(page_size + 1 - len(rows)).all()
+            if len(rows) > page_size:
+                break
+
+    last = rows[page_size - 1] if len(rows) > page_size else None
+    next_key = (last.priority if sort == "Priority" else priority, last.due_date, last.id) if last else None
+    return rows[:page_size], next_key
+
+def get_task_ids(completed=None, priority=None, search=None):
+    """Ids of every task matching the filters"""
+    with session_scope(Session) as session:
+        return [row.id for row in _filtered(session.query(Task.id), completed, priority, search)]
 
-def get_tasks():
-    session = Session()
-    tasks = session.query(Task).all()
-    session.close()
-    return tasks
+def update_tasks(task_ids, **values):
+    """Apply ``values`` to every task in ``task_ids`` with one UPDATE; returns the row count"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return 0
+    with session_scope(Session) as session:
+        result = session.execute(
+            update(Task).where(Task.id.in_(task_ids)).values(**values)
+        )
+    query_cache.invalidate(engine, "tasks")
+    return result.rowcount
+
+def delete_tasks(task_ids):
+    """Delete every task in ``task_ids`` with one DELETE; returns the row count"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return 0
+    with session_scope(Session) as session:
+        result = session.execute(delete(Task).where(Task.id.in_(task_ids)))
+    query_cache.invalidate(engine, "tasks")
+    return result.rowcount
+
+def complete_tasks(task_ids):
+    return update_tasks(task_ids, completed=True, completed_at=datetime.datetime.now())
+
+def reopen_tasks(task_ids):
+    return update_tasks(task_ids, completed=False, completed_at=None)
+
+def reprioritize_tasks(task_ids, priority):
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    return update_tasks(task_ids, priority=priority)
+
+def reschedule_tasks(task_ids, due_date):
+    return update_tasks(task_ids, due_date=due_date)
 
 def update_task_status(task_id, completed):
-    session = Session()
-    task = session.query(Task).filter_by(id=task_id).first()
-    if task:
-        task.completed = completed
-        session.commit()
-    session.close()
+    if completed:
+        complete_tasks([task_id])
+    else:
+        reopen_tasks([task_id])
 
 def delete_task(task_id):
-    session = Session()
-    task = session.query(Task).filter_by(id=task_id).first()
-    if task:
-        session.delete(task)
-        session.commit()
-    session.close()
+    delete_tasks([task_id])
+
+# Lead time per completed task in days, ranked within its completion week
+LEAD_TIME_QUERY = """
+    WITH lead_times AS (
+        SELECT date(completed_at, 'weekday 0', '-6 days') AS week,
+               julianday(completed_at) - julianday(created_at) AS days
+        FROM tasks
+        WHERE completed = 1 AND completed_at IS NOT NULL AND created_at IS NOT NULL
+    ), ranked AS (
+        SELECT week, days,
+               ROW_NUMBER() OVER (PARTITION BY week ORDER BY days) AS rank,
+               COUNT(*) OVER (PARTITION BY week) AS total
+        FROM lead_times
+    )
+    SELECT week, MAX(total),
+           MIN(CASE WHEN rank >= 0.5 * total THEN days END),
+           MIN(CASE WHEN rank >= 0.9 * total THEN days END)
+    FROM ranked
+    GROUP BY week
+    ORDER BY week
+"""
+
+def _query_frame(connection, sql, columns, params=()):
+    return pd.DataFrame(connection.exec_driver_sql(sql, params).fetchall(), columns=columns)
+
+@query_cache.cached(engine, "tasks")
+def _task_analytics(today):
+    with engine.connect() as connection:
+        return {
+            'priority': _query_frame(
+                connection,
+                "SELECT priority, COUNT(*) FROM tasks GROUP BY priority",
+                ['Priority', 'Tasks']
+            ),
+            'due_month': _query_frame(
+                connection,
+                "SELECT strftime('%Y-%m', due_date) AS month, COUNT(*) FROM tasks "
+                "GROUP BY month ORDER BY month",
+                ['Month', 'Tasks']
+            ),
+            'overdue': _query_frame(
+                connection,
+                "SELECT priority, COUNT(*) FROM tasks WHERE completed = 0 AND due_date < ? "
+                "GROUP BY priority",
+                ['Priority', 'Tasks'],
+                (today.isoformat(),)
+            ),
+            'lead_time': _query_frame(
+                connection, LEAD_TIME_QUERY, ['Week', 'Completed', 'P50 Days', 'P90 Days']
+            ),
+        }
+
+def get_task_analytics():
+    """Priority, due month, overdue and lead-time aggregates, cached until the next write"""
+    return _task_analytics(datetime.date.today())
+
+def _nth_smallest(days, fraction):
+    """The smallest value at or above ``fraction`` of a sorted group, as LEAD_TIME_QUERY picks it"""
+    return days.iloc[math.ceil(fraction * len(days)) - 1]
+
+@query_cache.cached(engine, "tasks", "snapshot_changes")
+def _snapshot_task_analytics(today):
+    tasks = snapshots.read_snapshot(engine, SNAPSHOT_TABLES[0], columns=[
+        'priority', 'due_date', 'completed', 'created_at', 'completed_at'
+    ])
+    if tasks is None:
+        return None
+    due_date = pd.to_datetime(tasks['due_date'])
+    
+    def counts(frame, keys, name):
+        totals = frame.groupby(keys, dropna=False).size().reset_index()
+        return totals.set_axis([name, 'Tasks'], axis=1)
+    
+    # Lead times of completed tasks, grouped by the Monday of their completion week
+    done = tasks[tasks['completed'].eq(True)].dropna(subset=['created_at', 'completed_at'])
+    completed_at = pd.to_datetime(done['completed_at'])
+    lead_times = pd.DataFrame({
+        'week': (completed_at.dt.normalize() - pd.to_timedelta(completed_at.dt.weekday, unit='D'))
+        .dt.strftime('%Y-%m-%d'),
+        'days': (completed_at - pd.to_datetime(done['created_at'])).dt.total_seconds() / 86400
+    }).sort_values('days', kind='stable')
+    weeks = lead_times.groupby('week')['days']
+    lead_time = pd.DataFrame({
+        'Completed': weeks.size(),
+        'P50 Days': weeks.apply(_nth_smallest, 0.5),
+        'P90 Days': weeks.apply(_nth_smallest, 0.9)
+    }).rename_axis('Week').reset_index()
+    
+    overdue = tasks[tasks['completed'].eq(False) & (due_date < pd.Timestamp(today))]
+    return {
+        'priority': counts(tasks, 'priority', 'Priority'),
+        'due_month': counts(tasks, due_date.dt.strftime('%Y-%m'), 'Month').sort_values(
+            'Month', na_position='first', ignore_index=True
+        ),
+        'overdue': counts(overdue, 'priority', 'Priority'),
+        'lead_time': lead_time,
+    }
+
+def get_snapshot_task_analytics():
+    """The aggregates of get_task_analytics computed from the Parquet snapshot; None if missing or stale"""
+    return _snapshot_task_analytics(datetime.date.today())
+
+
+# Bulk actions offered in the task list, by label
+BULK_ACTIONS = {
+    "Complete": complete_tasks,
+    "Reopen": reopen_tasks,
+    "Delete": delete_tasks,
+    "Set priority": reprioritize_tasks,
+    "Reschedule": reschedule_tasks,
+}
+
+# Extra form fields each bulk action takes, after the task ids
+BULK_ACTION_ARGS = {
+    "Set priority": ("priority",),
+    "Reschedule": ("due_date",),
+}
+
+def _apply_bulk_action(prefix, filters):
+    """Form callback: runs the chosen bulk action before the rerun renders"""
+    state = st.session_state
+    if state[f"{prefix}_bulk_all"]:
+        task_ids = get_task_ids(*filters)
+    else:
+        task_ids = state[f"{prefix}_bulk_ids"]
+    action = state[f"{prefix}_bulk_action"]
+    count = BULK_ACTIONS[action](task_ids, *[
+        state[f"{prefix}_bulk_{arg}"] for arg in BULK_ACTION_ARGS.get(action, ())
+    ])
+    state[f"{prefix}_bulk_ids"] = []
+    state[f"{prefix}_bulk_result"] = f"{action}: {count} task(s) updated"
+
+def _next_page(prefix, key):
+    st.session_state[f"{prefix}_cursors"].append(key)
+    st.session_state[f"{prefix}_bulk_ids"] = []
+
+def _previous_page(prefix):
+    st.session_state[f"{prefix}_cursors"].pop()
+    st.session_state[f"{prefix}_bulk_ids"] = []
+
+def render_task_list(prefix, completed):
+    """Filterable, paginated task list; only the visible page is queried and rendered"""
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        search = st.text_input("Search", key=f"{prefix}_search").strip() or None
+    with col2:
+        priority = st.selectbox("Priority", ["All"] + PRIORITIES, key=f"{prefix}_priority")
+    with col3:
+        sort = st.selectbox("Sort by", SORT_ORDERS, key=f"{prefix}_sort")
+    priority = None if priority == "All" else priority
+    
+    # Go back to the first page whenever the filters change
+    filters = (completed, priority, search)
+    if st.session_state.get(f"{prefix}_filters") != (filters, sort):
+        st.session_state[f"{prefix}_filters"] = (filters, sort)
+        st.session_state[f"{prefix}_cursors"] = [None]
+    cursors = st.session_state[f"{prefix}_cursors"]
+    
+    page, next_key = get_task_page(cursors[-1], PAGE_SIZE, *filters, sort=sort)
+    if not page:
+        st.write("No tasks found.")
+        return
+    
+    labels = {task.id: f"{task.title} ({task.priority}, due {task.due_date})" for task in page}
+    with st.form(f"{prefix}_bulk"):
+        st.multiselect(
+            "Select tasks on this page", list(labels), format_func=labels.get, key=f"{prefix}_bulk_ids"
+        )
+        st.checkbox("Apply to every task matching the filters", key=f"{prefix}_bulk_all")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.selectbox("Action", list(BULK_ACTIONS), key=f"{prefix}_bulk_action")
+        with col2:
+            st.selectbox("New priority", PRIORITIES, key=f"{prefix}_bulk_priority")
+        with col3:
+            st.date_input("New due date", datetime.date.today(), key=f"{prefix}_bulk_due_date")
+        st.form_submit_button("Apply", on_click=_apply_bulk_action, args=(prefix, filters))
+    
+    if f"{prefix}_bulk_result" in st.session_state:
+        st.success(st.session_state.pop(f"{prefix}_bulk_result"))
+    
+    for task in page:
+        status = "Completed" if task.completed else f"{task.priority} Priority"
+        with st.expander(f"{task.title} - {status}"):
+            col1, col2, col3 = st.columns([3, 1, 1])
+            
+            with col1:
+                st.write(f"**Description:** {task.description}")
+                st.write(f"**Due Date:** {task.due_date}")
+                if task.completed_at:
+                    st.write(f"**Completed On:** {task.completed_at:%Y-%m-%d}")
+            
+            with col2:
+                st.button(
+                    "Reopen" if task.completed else "Complete", key=f"{prefix}_toggle_{task.id}",
+                    on_click=update_task_status, args=(task.id, not task.completed)
+                )
+            
+            with col3:
+                st.button(
+                    "Delete", key=f"{prefix}_delete_{task.id}",
+                    on_click=delete_task, args=(task.id,)
+                )
+    
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        st.button(
+            "Previous", key=f"{prefix}_previous", on_click=_previous_page, args=(prefix,),
+            disabled=len(cursors) == 1
+        )
+    with col2:
+        st.button(
+            "Next", key=f"{prefix}_next", on_click=_next_page, args=(prefix, next_key),
+            disabled=next_key is None
+        )
+    with col3:
+        st.caption(f"Page {len(cursors)}")
 
 def main():
     st.title("📋 Task Management App")
@@ -64,7 +400,7 @@ def main():
     st.sidebar.header("Add New Task")
     title = st.sidebar.text_input("Task Title")
     description = st.sidebar.text_area("Task Description")
-    priority = st.sidebar.selectbox("Priority", ["Low", "Medium", "High"])
+    priority = st.sidebar.selectbox("Priority", PRIORITIES)
     due_date = st.sidebar.date_input("Due Date", datetime.date.today())
     
     if st.sidebar.button("Add Task"):
@@ -76,62 +412,60 @@ def main():
     
     with tab1:
         st.header("Current Tasks")
-        tasks = get_tasks()
-        
-        for task in tasks:
-            if not task.completed:
-                with st.expander(f"{task.title} - {task.priority} Priority"):
-                    col1, col2, col3 = st.columns([3, 1, 1])
-                    
-                    with col1:
-                        st.write(f"**Description:** {task.description}")
-                        st.write(f"**Due Date:** {task.due_date}")
-                    
-                    with col2:
-                        if st.button(f"Complete {task.id}", key=f"complete_{task.id}"):
-                            update_task_status(task.id, True)
-                            st.experimental_rerun()
-                    
-                    with col3:
-                        if st.button(f"Delete {task.id}", key=f"delete_{task.id}"):
-                            delete_task(task.id)
-                            st.experimental_rerun()
+        render_task_list("open", completed=False)
     
     with tab2:
         st.header("Task Analytics")
-        if tasks:
-            # Priority Distribution
-            priority_counts = {}
-            for task in tasks:
-                priority_counts[task.priority] = priority_counts.get(task.priority, 0) + 1
+        
+        # Large task histories can be scanned from the Parquet snapshot instead of SQLite
+        analytics = None
+        if st.toggle("Read from Parquet snapshot", key="use_snapshot"):
+            analytics = get_snapshot_task_analytics()
+            if analytics is None:
+                st.info("No up-to-date snapshot of the tasks; reading the live database.")
+        if analytics is None:
+            analytics = get_task_analytics()
+        if not analytics['priority'].empty:
+            lead_time = analytics['lead_time']
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Overdue Tasks", int(analytics['overdue']['Tasks'].sum()))
+            if not lead_time.empty:
+                col2.metric("Median Lead Time", f"{lead_time['P50 Days'].median():.1f} days")
+                col3.metric("Median Weekly Throughput", f"{lead_time['Completed'].median():.0f} tasks")
             
+            # Priority Distribution
             fig1 = px.pie(
-                values=list(priority_counts.values()), 
-                names=list(priority_counts.keys()), 
+                analytics['priority'], values='Tasks', names='Priority',
                 title='Task Priority Distribution'
             )
             st.plotly_chart(fig1)
             
             # Tasks by Month
-            task_months = [task.due_date.strftime("%B") for task in tasks]
-            month_counts = {}
-            for month in task_months:
-                month_counts[month] = month_counts.get(month, 0) + 1
-            
+            due_month = analytics['due_month']
             fig2 = go.Figure(data=[
-                go.Bar(x=list(month_counts.keys()), y=list(month_counts.values()))
+                go.Bar(x=due_month['Month'], y=due_month['Tasks'])
             ])
             fig2.update_layout(title='Tasks by Month', xaxis_title='Month', yaxis_title='Number of Tasks')
             st.plotly_chart(fig2)
+            
+            if not analytics['overdue'].empty:
+                fig3 = px.bar(
+                    analytics['overdue'], x='Priority', y='Tasks', title='Overdue Tasks by Priority'
+                )
+                st.plotly_chart(fig3)
+            
+            if not lead_time.empty:
+                fig4 = px.line(
+                    lead_time, x='Week', y=['P50 Days', 'P90 Days'], title='Lead Time by Completion Week'
+                )
+                st.plotly_chart(fig4)
+                
+                fig5 = px.bar(lead_time, x='Week', y='Completed', title='Weekly Throughput')
+                st.plotly_chart(fig5)
     
     with tab3:
         st.header("Completed Tasks")
-        completed_tasks = [task for task in tasks if task.completed]
-        
-        for task in completed_tasks:
-            with st.expander(f"{task.title} - Completed"):
-                st.write(f"**Description:** {task.description}")
-                st.write(f"**Completed On:** {datetime.date.today()}")
+        render_task_list("done", completed=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine
+
+from common import snapshots
+
+def _triggers(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'"
+        ).scalar()
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tracker.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE expenses (id INTEGER PRIMARY KEY, date DATE)")
+        for step in snapshots.change_tracking_steps("expenses", "date"):
+            connection.exec_driver_sql(step)
+    yield engine
+    engine.dispose()
+
+def test_untracked_keeps_triggers_when_the_block_raises(engine):
+    with pytest.raises(RuntimeError):
+        with engine.begin() as connection, snapshots.untracked(connection, "expenses"):
+            connection.exec_driver_sql("INSERT INTO expenses (date) VALUES ('2024-01-02')")
+            raise RuntimeError("bad chunk")
+
+    assert _triggers(engine) == 3
+    with engine.begin() as connection:
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM expenses").scalar() == 0
+        connection.exec_driver_sql("INSERT INTO expenses (date) VALUES ('2024-03-04')")
+        changes = connection.exec_driver_sql("SELECT partition FROM snapshot_changes").fetchall()
+    assert changes == [("2024-03",)]
+
+def test_untracked_skips_per_row_logging(engine):
+    with engine.begin() as connection:
+        with snapshots.untracked(connection, "expenses") as tracked:
+            connection.exec_driver_sql("INSERT INTO expenses (date) VALUES ('2024-01-02')")
+        assert tracked
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM snapshot_changes").scalar() == 0
+
+    assert _triggers(engine) == 3
@@ -1,14 +1,23 @@
 import streamlit as st
-from deep_translator import GoogleTranslator
-from gtts import gTTS
-import streamlit as st
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common.lazy_imports import lazy_import
 import os
 
+# Heavy dependencies are only imported when first used
+deep_translator = lazy_import("deep_translator")
+gtts = lazy_import("gtts")
+
 def main():
     st.title("🌐 Translation App (Deep Translator)")
 
     # Get supported languages
-    langs = GoogleTranslator().get_supported_languages(as_dict=True)
+    langs = deep_translator.GoogleTranslator().get_supported_languages(as_dict=True)
     lang_names = list(langs.keys())
 
     # Input Text
@@ -33,7 +42,7 @@ def main():
             st.warning("Please select both source and destination languages.")
         else:
             try:
-                translator = GoogleTranslator(source=src_lang, target=dest_lang)
+                translator = deep_translator.GoogleTranslator(source=src_lang, target=dest_lang)
                 translated_text = translator.translate(text_input.strip())
                 st.session_state['translated_text'] = translated_text
                 st.session_state['last_dest_lang'] = dest_lang
@@ -50,7 +59,7 @@ def main():
         if st.button("Play Translated Audio"):
             try:
                 gtts_lang_code = st.session_state['last_dest_lang'][:2]
-                tts = gTTS(text=st.session_state['translated_text'], lang=gtts_lang_code)
+                tts = gtts.gTTS(text=st.session_state['translated_text'], lang=gtts_lang_code)
                 audio_file = "temp_tts.mp3"
                 tts.save(audio_file)
                 audio_bytes = open(audio_file, 'rb').read()
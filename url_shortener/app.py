@@ -1,6 +1,16 @@
 import streamlit as st
-from pyshorteners import Shortener
-import validators
+import sys
+from pathlib import Path
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from common.lazy_imports import lazy_import
+
+# Heavy dependencies are only imported when first used
+pyshorteners = lazy_import("pyshorteners")
+validators = lazy_import("validators")
 
 def is_valid_url(url):
     # Check if URL starts with http:// or https://
@@ -19,7 +29,7 @@ def main():
     if st.button("Shorten URL") and long_url:
         try:
             # Create a shortener instance
-            shortener = Shortener()
+            shortener = pyshorteners.Shortener()
             # Generate short URL
             short_url = shortener.tinyurl.short(long_url)
             st.success(f"Short URL: {short_url}")
@@ -34,7 +44,7 @@ def main():
     if st.button("Expand URL") and short_url:
         try:
             # Create a shortener instance
-            shortener = Shortener()
+            shortener = pyshorteners.Shortener()
             # Expand URL
             long_url = shortener.tinyurl.expand(short_url)
             st.success(f"Original URL: {long_url}")